@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Measures request throughput of a running API instance.
+
+Keeps `--concurrency` requests in flight against one URL for `--duration` seconds and
+reports requests per second and latency percentiles, e.g. to compare the WSGI and
+ASGI deployments (API_SERVER=wsgi / API_SERVER=asgi in bin/entrypoint.sh):
+
+    python bin/benchmark.py http://localhost:8000/api/notifications/?app_ids=vikunja \
+        --concurrency 200 --duration 20 -H "Remote-User: alice"
+"""
+import time
+import asyncio
+import argparse
+from collections import Counter
+from typing import Dict, List
+
+import httpx
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run(url: str, concurrency: int, duration: float, headers: Dict[str, str], timeout: float) -> Dict:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(headers=headers, timeout=timeout, limits=limits) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    await response.aread()
+                    statuses[response.status_code] += 1
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'elapsed': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'statuses': dict(statuses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent GET throughput of one API endpoint.")
+    parser.add_argument('url')
+    parser.add_argument('--concurrency', '-c', type=int, default=100, help="Requests kept in flight.")
+    parser.add_argument('--duration', '-d', type=float, default=10.0, help="Seconds to run.")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Per-request timeout in seconds.")
+    parser.add_argument('--header', '-H', action='append', default=[], help="'Name: value', may be repeated.")
+    args = parser.parse_args()
+
+    headers = dict(header.split(':', 1) for header in args.header)
+    headers = {name.strip(): value.strip() for name, value in headers.items()}
+    result = asyncio.run(run(args.url, args.concurrency, args.duration, headers, args.timeout))
+
+    print(f"{result['requests']} requests in {result['elapsed']:.1f}s with {args.concurrency} in flight")
+    print(f"{result['rps']:.1f} requests/s")
+    print(
+        f"latency p50 {result['p50'] * 1000:.0f}ms, p95 {result['p95'] * 1000:.0f}ms, "
+        f"p99 {result['p99'] * 1000:.0f}ms"
+    )
+    print(f"statuses: {result['statuses']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Measures serialization time and allocations of the configuration and batch notification payloads,
+comparing the previous path (model_dump() + stdlib json / DRF's JSONRenderer) with the current one
+(orjson via core.renderers.dump_json, Pydantic's serializer straight to bytes):
+
+    python bin/benchmark_json.py --apps 500 --extra-fields 8
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+import tracemalloc
+
+import pydantic_core
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django # noqa: E402
+django.setup()
+
+from rest_framework.renderers import JSONRenderer # noqa: E402
+
+from core.renderers import dump_json, orjson # noqa: E402
+from config.schemas import Config # noqa: E402
+from config.index import ConfigIndex # noqa: E402
+from config.permissions import build_role_permissions # noqa: E402
+from config.payloads import filter_navigation_items # noqa: E402
+from notifications.schemas import BatchNotificationCountResponse, NotificationCountResponse # noqa: E402
+
+
+def synthetic_config(apps: int, extra_fields: int, per_category: int = 10) -> Config:
+    """A config with `apps` apps in categories, each carrying `extra_fields` extra='allow' fields."""
+    def app(index):
+        return {
+            'id': f'app-{index}', 'title': f'App {index}', 'icon': 'mdi-application', 'url': f'https://app{index}.example.com/',
+            **{f'extra{field}': f'Description {field} of app {index} ' * 3 for field in range(extra_fields)},
+        }
+    categories = [
+        {'id': f'cat-{start}', 'title': f'Category {start}', 'icon': 'mdi-folder', 'apps': [app(index) for index in range(start, min(start + per_category, apps))]}
+        for start in range(0, apps, per_category)
+    ]
+    return Config(navigationItems=categories, roles={'Admin': {'permissions': ['*']}})
+
+
+def stdlib_dump(data) -> bytes:
+    """The serializer the configuration payloads used before (stdlib json, compact, UTF-8)."""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def measure(function, number: int) -> tuple[float, int]:
+    """Returns (microseconds per call, peak bytes allocated during one call)."""
+    per_call = min(timeit.repeat(function, number=number, repeat=5)) / number
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return per_call * 1e6, peak
+
+
+def report(title: str, candidates: dict, number: int):
+    print(title)
+    baseline = None
+    for name, function in candidates.items():
+        micros, peak = measure(function, number)
+        baseline = baseline or micros
+        print(f"  {name:<42} {micros:>10.1f}us  {baseline / micros:>5.1f}x  peak {peak / 1024:>8.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialization cost of the configuration and batch notification payloads.")
+    parser.add_argument('--apps', type=int, default=200, help="Apps in the configuration and in the batch response.")
+    parser.add_argument('--extra-fields', type=int, default=6, help="extra='allow' fields per app.")
+    parser.add_argument('--number', type=int, default=50, help="Calls per timing round.")
+    args = parser.parse_args()
+    print(f"orjson: {'installed' if orjson else 'not installed (dump_json falls back to the stdlib)'}")
+
+    config = synthetic_config(args.apps, args.extra_fields)
+    permissions = build_role_permissions(config.roles, ConfigIndex.build(config))['Admin']
+    navigation_items = filter_navigation_items(config, permissions)
+    report(f"Configuration navigationItems ({args.apps} apps, {args.extra_fields} extra fields each, built once per config version):", {
+        'stdlib json (before)': lambda: stdlib_dump(navigation_items),
+        'core.renderers.dump_json': lambda: dump_json(navigation_items),
+    }, args.number)
+
+    batch = BatchNotificationCountResponse(results={
+        f'app-{index}': NotificationCountResponse(count=index, cache='hit') for index in range(args.apps)
+    })
+    renderer = JSONRenderer()
+    report(f"Batch notification counts ({args.apps} apps, every request):", {
+        'model_dump() + DRF JSONRenderer (before)': lambda: renderer.render(batch.model_dump()),
+        'pydantic_response() (model to JSON bytes)': lambda: pydantic_core.to_json(batch),
+    }, args.number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Compares the default settings profile with API mode (API_MODE=true, see core/settings.py).
+
+For each profile, fresh interpreters measure the cold start (importing core.wsgi, i.e. settings,
+apps, models and the middleware chain) and the time to the first response; one of them then
+times repeated requests through the full handler to show the per-request overhead:
+
+    python bin/benchmark_profile.py /api/config/configuration/ --requests 5000
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a child interpreter so every measurement starts cold
+CHILD = r'''
+import sys, json, time
+started = time.perf_counter()
+from core.wsgi import application
+ready = time.perf_counter()
+from django.test import Client
+client = Client()
+path, requests = sys.argv[1], int(sys.argv[2])
+status = client.get(path).status_code
+first = time.perf_counter()
+timings = []
+for _ in range(requests):
+    request_started = time.perf_counter()
+    client.get(path)
+    timings.append(time.perf_counter() - request_started)
+print(json.dumps({'startup': ready - started, 'first': first - started, 'status': status, 'timings': timings}))
+'''
+
+
+def measure(path: str, api_mode: bool, starts: int, requests: int) -> dict:
+    env = {**os.environ, 'API_MODE': 'true' if api_mode else 'false'}
+    runs = []
+    for index in range(starts):
+        output = subprocess.run(
+            [sys.executable, '-c', CHILD, path, str(requests if index == 0 else 0)],
+            cwd=API_DIR, env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    timings = sorted(runs[0]['timings'])
+    return {
+        'status': runs[0]['status'],
+        'startup': statistics.median(run['startup'] for run in runs),
+        'first': statistics.median(run['first'] for run in runs),
+        'p50': timings[len(timings) // 2] if timings else 0.0,
+        'mean': statistics.fmean(timings) if timings else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start and per-request overhead of the default settings vs API mode.")
+    parser.add_argument('path', nargs='?', default='/api/config/configuration/')
+    parser.add_argument('--starts', type=int, default=5, help="Cold starts per profile (the median is reported).")
+    parser.add_argument('--requests', type=int, default=2000, help="Requests timed per profile after the first.")
+    args = parser.parse_args()
+
+    results = {name: measure(args.path, api_mode, args.starts, args.requests) for name, api_mode in (('default', False), ('api mode', True))}
+    for name, result in results.items():
+        print(
+            f"{name:>8}: status {result['status']}, startup {result['startup'] * 1000:.0f}ms, "
+            f"first response {result['first'] * 1000:.0f}ms, per request p50 {result['p50'] * 1e6:.0f}us "
+            f"(mean {result['mean'] * 1e6:.0f}us)"
+        )
+    default, lean = results['default'], results['api mode']
+    print(
+        f"API mode saves {(default['startup'] - lean['startup']) * 1000:.0f}ms at startup and "
+        f"{(default['mean'] - lean['mean']) * 1e6:.0f}us per request."
+    )
+
+
+if __name__ == '__main__':
+    main()
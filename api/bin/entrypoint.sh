@@ -1,3 +1,17 @@
 #!/bin/bash
-python manage.py migrate
-gunicorn core.wsgi --bind 0.0.0.0:8000 --workers 1 --threads 1
+API_MODE=false python manage.py migrate # Includes the admin and session tables API mode leaves out
+python manage.py compile_config || echo "Config could not be compiled; workers will report the error."
+if [ "${NOTIFICATIONS_POLLER:-false}" = "true" ]; then
+    # Background poller keeps notification counts fresh so requests never wait on upstream apps
+    python manage.py poll_notifications &
+fi
+if [ "${API_MODE:-false}" = "true" ] && [ -n "${ADMIN_PORT:-}" ]; then
+    # API mode serves no admin; run it in its own worker with the full middleware stack
+    API_MODE=false gunicorn core.wsgi --bind "0.0.0.0:${ADMIN_PORT}" --workers 1 --threads 1 &
+fi
+if [ "${API_SERVER:-wsgi}" = "asgi" ]; then
+    # Native async views: each worker serves many concurrent requests on one event loop
+    uvicorn core.asgi:application --host 0.0.0.0 --port 8000 --workers "${API_WORKERS:-1}" --no-access-log
+else
+    gunicorn core.wsgi --bind 0.0.0.0:8000 --workers 1 --threads 1
+fi
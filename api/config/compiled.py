@@ -0,0 +1,81 @@
+import os
+import pickle
+import logging
+import tempfile
+from dataclasses import dataclass
+from typing import Dict
+
+import pydantic
+
+from .schemas import Config as PydanticConfig
+from .index import ConfigIndex
+from .permissions import RolePermissions, build_role_permissions
+from .payloads import RolePayload, build_role_payloads
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever CompiledConfig or anything it contains changes shape, so stale cache files are ignored
+CACHE_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class CompiledConfig:
+    """A validated config together with everything derived from it at load time."""
+    config: PydanticConfig
+    index: ConfigIndex
+    role_permissions: Dict[str, RolePermissions]
+    role_payloads: Dict[str, RolePayload]
+
+    @classmethod
+    def compile(cls, config: PydanticConfig) -> 'CompiledConfig':
+        index = ConfigIndex.build(config)
+        role_permissions = build_role_permissions(config.roles, index)
+        role_payloads = build_role_payloads(config, role_permissions)
+        return cls(config=config, index=index, role_permissions=role_permissions, role_payloads=role_payloads)
+
+
+def _cache_header(digest: str) -> dict:
+    return {'format': CACHE_FORMAT_VERSION, 'pydantic': pydantic.VERSION, 'digest': digest}
+
+
+def read_compiled_config(cache_path, digest: str) -> CompiledConfig | None:
+    """
+    Loads a compiled config from `cache_path` if it was built from a config.yml with this
+    SHA-256 `digest` by the same cache format and Pydantic version. Returns None on any miss.
+
+    The cache is a pickle, so it must live somewhere only the API itself can write to.
+    """
+    try:
+        with open(cache_path, 'rb') as f:
+            # The small header is unpickled first, so a stale cache never deserializes its payload
+            if pickle.load(f) != _cache_header(digest):
+                return None
+            compiled = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable compiled config cache at {cache_path}: {e}")
+        return None
+
+    if not isinstance(compiled, CompiledConfig):
+        logger.warning(f"Ignoring compiled config cache at {cache_path}: unexpected payload type {type(compiled)}")
+        return None
+    return compiled
+
+
+def write_compiled_config(cache_path, digest: str, compiled: CompiledConfig) -> None:
+    """Atomically writes a compiled config cache file keyed by the config file's `digest`."""
+    cache_dir = os.path.dirname(os.fspath(cache_path)) or '.'
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.config-cache-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(_cache_header(digest), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path) # Readers see either the old or the new file, never a partial one
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,60 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from .schemas import AppLink, NavCategory, Config as PydanticConfig
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ConfigIndex:
+    """
+    Lookup tables derived from a loaded config, built once per config snapshot
+    so app lookups don't have to walk the navigation tree on every request.
+    """
+    apps_by_id: Dict[str, AppLink]
+    category_by_app_id: Dict[str, NavCategory] # Only apps nested in a category have an entry
+    apps_by_category_id: Dict[str, Tuple[AppLink, ...]]
+    app_ids: FrozenSet[str]
+
+    @classmethod
+    def build(cls, config: PydanticConfig) -> 'ConfigIndex':
+        apps_by_id: Dict[str, AppLink] = {}
+        category_by_app_id: Dict[str, NavCategory] = {}
+        apps_by_category_id: Dict[str, Tuple[AppLink, ...]] = {}
+
+        def add_app(app: AppLink, category: Optional[NavCategory] = None):
+            if app.id in apps_by_id:
+                # Keep the first occurrence, matching the order the navigation tree is walked in
+                logger.warning(f"Duplicate app id '{app.id}' in configuration; ignoring later definition.")
+                return
+            apps_by_id[app.id] = app
+            if category is not None:
+                category_by_app_id[app.id] = category
+
+        for nav_item_wrapper in config.navigationItems:
+            item = nav_item_wrapper.root
+            if isinstance(item, AppLink):
+                add_app(item)
+            elif isinstance(item, NavCategory):
+                apps_by_category_id[item.id] = tuple(item.apps)
+                for app in item.apps:
+                    add_app(app, item)
+
+        return cls(
+            apps_by_id=apps_by_id,
+            category_by_app_id=category_by_app_id,
+            apps_by_category_id=apps_by_category_id,
+            app_ids=frozenset(apps_by_id),
+        )
+
+    def get_app(self, app_id: str) -> Optional[AppLink]:
+        return self.apps_by_id.get(app_id)
+
+    def get_category(self, app_id: str) -> Optional[NavCategory]:
+        """Returns the category an app is nested in, or None for top-level apps."""
+        return self.category_by_app_id.get(app_id)
+
+    def has_app(self, app_id: str) -> bool:
+        return app_id in self.app_ids
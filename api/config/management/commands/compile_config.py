@@ -0,0 +1,46 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from config.services import ConfigService, ConfigError, CONFIG_CACHE_PATH
+from config.compiled import read_compiled_config, write_compiled_config
+
+
+class Command(BaseCommand):
+    help = (
+        "Parses and validates config.yml and writes its compiled snapshot cache, "
+        "so API workers can start without parsing YAML. Run it e.g. at image build or before starting workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--config', help="Path to config.yml (defaults to settings.APP_CONFIG_PATH).")
+        parser.add_argument('--output', help="Cache file to write (defaults to settings.APP_CONFIG_CACHE_PATH).")
+
+    def handle(self, *args, **options):
+        service = ConfigService(reload_interval=None, cache_path=None)
+        if options['config']:
+            service.config_path = options['config']
+        cache_path = options['output'] or CONFIG_CACHE_PATH
+        if not cache_path:
+            raise CommandError("No cache path given and APP_CONFIG_CACHE_PATH is disabled.")
+
+        try:
+            started = time.perf_counter()
+            raw_bytes, digest = service.read_config_file()
+            compiled = service.compile_config(raw_bytes)
+            compile_ms = (time.perf_counter() - started) * 1000
+        except ConfigError as e:
+            raise CommandError(f"Configuration is invalid: {e}")
+
+        write_compiled_config(cache_path, digest, compiled)
+
+        # Verify the file round-trips to the same runtime form before declaring success
+        started = time.perf_counter()
+        cached = read_compiled_config(cache_path, digest)
+        load_ms = (time.perf_counter() - started) * 1000
+        if cached is None or cached.config != compiled.config or cached.role_payloads != compiled.role_payloads:
+            raise CommandError(f"Compiled snapshot at {cache_path} failed verification.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Compiled {service.config_path} ({digest[:12]}) to {cache_path}: "
+            f"full parse {compile_ms:.1f} ms, cached load {load_ms:.1f} ms."
+        ))
@@ -0,0 +1,43 @@
+import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .principal import principal_resolver
+from .services import ConfigError, get_config_service
+
+logger = logging.getLogger(__name__)
+
+
+class PrincipalMiddleware:
+    """
+    Sets `request.principal` (see config.principal) once per request, so views read the user's
+    identifier, role and permissions instead of each loading the config and parsing the headers.
+    Works under WSGI and ASGI; in async mode the config snapshot is read without blocking the loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config_service = get_config_service()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        try:
+            snapshot = self.config_service.get_snapshot()
+        except ConfigError as e:
+            logger.error(f"Could not load main application config to identify user: {e}")
+            snapshot = None
+        request.principal = principal_resolver.resolve(snapshot, request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        try:
+            snapshot = await self.config_service.aget_snapshot()
+        except ConfigError as e:
+            logger.error(f"Could not load main application config to identify user: {e}")
+            snapshot = None
+        request.principal = principal_resolver.resolve(snapshot, request)
+        return await self.get_response(request)
@@ -0,0 +1,186 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+from django.conf import settings
+
+from core.renderers import dump_json # Compact UTF-8 JSON, with orjson when installed
+from .schemas import AppLink, NavCategory, Config as PydanticConfig
+from .permissions import RolePermissions
+
+
+@dataclass(frozen=True)
+class RolePayload:
+    """
+    The role-dependent part of the configuration response, precomputed once per config snapshot.
+    `body_tail` holds the already serialized `"navigationItems":...,"keybindings":...` members,
+    so a response only has to splice in the per-user fields.
+    """
+    role: str
+    navigation_items: List[dict]
+    body_tail: bytes
+
+    def render(self, user_email: str | None) -> bytes:
+        """Returns the full JSON response body for a user with this role."""
+        return b''.join((
+            b'{"userEmail":', dump_json(user_email),
+            b',"role":', dump_json(self.role),
+            b',', self.body_tail,
+            b'}',
+        ))
+
+    def etag(self, config_digest: str, user_email: str | None) -> str:
+        """
+        Strong ETag for `render(user_email)`. The config digest identifies the config version
+        across workers; the user is folded in because the body carries their email.
+        """
+        principal_hash = hashlib.sha256(f"{self.role}\0{user_email or ''}".encode('utf-8')).hexdigest()[:16]
+        return f'"{config_digest[:16]}-{principal_hash}"'
+
+
+DELTA_CACHE_MAX_ENTRIES = getattr(settings, 'APP_CONFIG_DELTA_CACHE_MAX_ENTRIES', 256) # Serialized navigation deltas kept
+
+
+class NavigationDeltaCache:
+    """
+    A thread-safe, size-bounded LRU cache of serialized navigation deltas, keyed by
+    (since version_id, version_id, role): every user of a role polling from the same
+    version gets the same delta, so it is computed and serialized once.
+    """
+    def __init__(self, max_entries: int = DELTA_CACHE_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._entries: 'OrderedDict[Tuple[str, str, str], bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Tuple[str, str, str], build: Callable[[], bytes]) -> bytes:
+        with self._lock:
+            delta = self._entries.get(key)
+            if delta is not None:
+                self._entries.move_to_end(key)
+                return delta
+        delta = build()
+        with self._lock:
+            self._entries[key] = delta
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False) # Evict the least recently used entry
+        return delta
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide cache used by render_delta
+navigation_deltas = NavigationDeltaCache()
+
+
+def _category_delta(old: dict, new: dict) -> dict:
+    """The changes to a category's apps (by id) and, if they changed, to its own fields."""
+    old_apps = {app['id']: app for app in old['apps']}
+    new_app_ids = [app['id'] for app in new['apps']]
+    remaining = set(new_app_ids)
+    delta = {
+        'upserted': [app for app in new['apps'] if old_apps.get(app['id']) != app],
+        'removed': [app_id for app_id in old_apps if app_id not in remaining],
+    }
+    if new_app_ids != list(old_apps):
+        delta['appOrder'] = new_app_ids
+    fields = {key: value for key, value in new.items() if key != 'apps'}
+    if fields != {key: value for key, value in old.items() if key != 'apps'}:
+        delta['fields'] = fields
+    return delta
+
+
+def navigation_delta(old_items: List[dict], new_items: List[dict]) -> dict:
+    """
+    What changed between two filtered navigation trees, by id:
+
+    - `order`: the ids of the new top-level items, in order.
+    - `upserted` / `removed`: top-level items that are new or changed (sent whole), and ids that are gone.
+    - `categories`: per category present in both trees that changed, its `upserted` and `removed`
+      apps, `appOrder` (only when the app ids or their order changed) and `fields` (the category
+      without `apps`, only when those changed).
+
+    Categories are diffed app by app, so changing one app's URL sends only that app.
+    """
+    old_by_id = {item['id']: item for item in old_items}
+    new_ids = {item['id'] for item in new_items}
+    upserted, categories = [], {}
+    for item in new_items:
+        old = old_by_id.get(item['id'])
+        if old == item:
+            continue
+        if old is not None and 'apps' in old and 'apps' in item:
+            categories[item['id']] = _category_delta(old, item)
+        else: # New, a changed app, or an app that became a category (or vice versa)
+            upserted.append(item)
+    return {
+        'order': [item['id'] for item in new_items],
+        'upserted': upserted,
+        'removed': [item_id for item_id in old_by_id if item_id not in new_ids],
+        'categories': categories,
+    }
+
+
+def render_delta(
+    user_email: str | None,
+    config: PydanticConfig,
+    payload: RolePayload,
+    version_id: str,
+    since_payload: RolePayload,
+    since_id: str,
+) -> bytes:
+    """
+    Returns the JSON body of a delta configuration response: like RolePayload.render, but with
+    `navigationItemsDelta` (see navigation_delta) against the role's payload of version `since_id`
+    in place of `navigationItems`.
+    """
+    delta = navigation_deltas.get_or_build(
+        (since_id, version_id, payload.role),
+        lambda: dump_json(navigation_delta(since_payload.navigation_items, payload.navigation_items)),
+    )
+    return b''.join((
+        b'{"userEmail":', dump_json(user_email),
+        b',"role":', dump_json(payload.role),
+        b',"version":', dump_json(version_id),
+        b',"since":', dump_json(since_id),
+        b',"navigationItemsDelta":', delta,
+        b',"defaultToolbarColor":', dump_json(config.defaultToolbarColor),
+        b',"keybindings":', dump_json(config.keybindings),
+        b'}',
+    ))
+
+
+def filter_navigation_items(config: PydanticConfig, permissions: RolePermissions) -> List[dict]:
+    """Returns the navigation tree as plain dicts, keeping only the items the role may access."""
+    accessible_navigation_items_data = []
+    for nav_item_wrapper in config.navigationItems:
+        item = nav_item_wrapper.root # Access the actual AppLink or NavCategory
+
+        if isinstance(item, AppLink):
+            if permissions.can_access(item.id):
+                accessible_navigation_items_data.append(item.model_dump())
+        elif isinstance(item, NavCategory):
+            accessible_apps_data = [app.model_dump() for app in item.apps if permissions.can_access(app.id)]
+            if accessible_apps_data:
+                # Create a new dict for the category to avoid modifying original Pydantic model
+                category_data = item.model_dump()
+                category_data['apps'] = accessible_apps_data
+                accessible_navigation_items_data.append(category_data)
+    return accessible_navigation_items_data
+
+
+def build_role_payloads(config: PydanticConfig, role_permissions: Dict[str, RolePermissions]) -> Dict[str, RolePayload]:
+    """Precomputes the filtered, serialized configuration payload for every compiled role."""
+    payloads = {}
+    for role_name, permissions in role_permissions.items():
+        navigation_items = filter_navigation_items(config, permissions)
+        body_tail = b''.join((
+            b'"navigationItems":', dump_json(navigation_items),
+            b',"defaultToolbarColor":', dump_json(config.defaultToolbarColor),
+            b',"keybindings":', dump_json(config.keybindings),
+        ))
+        payloads[role_name] = RolePayload(role=role_name, navigation_items=navigation_items, body_tail=body_tail)
+    return payloads
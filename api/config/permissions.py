@@ -0,0 +1,107 @@
+import re
+import fnmatch
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional, Pattern
+
+from .index import ConfigIndex
+from .schemas import Role as PydanticRole
+
+WILDCARD = '*'
+DENY_PREFIX = '!'
+_GLOB_CHARS = frozenset('*?[')
+
+
+def _compile_patterns(patterns: Iterable[str]) -> Optional[Pattern]:
+    """Combines glob patterns into a single anchored regex, or None if there are none."""
+    patterns = sorted(set(patterns))
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{fnmatch.translate(pattern)})' for pattern in patterns))
+
+
+class PermissionMatcher:
+    """
+    Decides whether a role may see an item, compiled once from a role's permission list.
+
+    Permission entries are item ids (`app-grafana`), glob patterns (`app-media-*`) or
+    either of those prefixed with `!` to deny. For an app, the most specific rule wins:
+      1. a deny matching the app itself,
+      2. an allow matching the app itself,
+      3. a deny matching its category,
+      4. an allow matching its category (apps inherit their category's access),
+      5. a lone `*`, which grants everything not denied above.
+    Plain ids are set lookups; all patterns of a kind are matched with one combined regex.
+    """
+    def __init__(self, permissions: Iterable[str]):
+        allow_exact, deny_exact = set(), set()
+        allow_patterns, deny_patterns = set(), set()
+        self.allow_all = False
+
+        for entry in permissions:
+            entry = entry.strip()
+            deny = entry.startswith(DENY_PREFIX)
+            if deny:
+                entry = entry[len(DENY_PREFIX):].strip()
+            if not entry:
+                continue
+            if entry == WILDCARD and not deny:
+                self.allow_all = True
+            elif _GLOB_CHARS.intersection(entry):
+                (deny_patterns if deny else allow_patterns).add(entry)
+            else:
+                (deny_exact if deny else allow_exact).add(entry)
+
+        self.allow_exact: FrozenSet[str] = frozenset(allow_exact)
+        self.deny_exact: FrozenSet[str] = frozenset(deny_exact)
+        self._allow_regex = _compile_patterns(allow_patterns)
+        self._deny_regex = _compile_patterns(deny_patterns)
+
+    def _denies(self, item_id: str) -> bool:
+        return item_id in self.deny_exact or (self._deny_regex is not None and self._deny_regex.match(item_id) is not None)
+
+    def _allows(self, item_id: str) -> bool:
+        return item_id in self.allow_exact or (self._allow_regex is not None and self._allow_regex.match(item_id) is not None)
+
+    def matches(self, item_id: str, category_id: Optional[str] = None) -> bool:
+        """Returns True if the item (optionally nested in `category_id`) is accessible."""
+        if self._denies(item_id):
+            return False
+        if self._allows(item_id):
+            return True
+        if category_id is not None:
+            if self._denies(category_id):
+                return False
+            if self._allows(category_id):
+                return True
+        return self.allow_all
+
+
+@dataclass(frozen=True)
+class RolePermissions:
+    """
+    A role's compiled matcher plus the precomputed set of visible item ids in one config.
+    A category counts as visible when at least one of its apps is.
+    """
+    matcher: PermissionMatcher
+    visible_ids: FrozenSet[str]
+
+    @classmethod
+    def build(cls, role: PydanticRole, index: ConfigIndex) -> 'RolePermissions':
+        matcher = PermissionMatcher(role.permissions)
+        visible_ids = set()
+        for app_id in index.app_ids:
+            category = index.get_category(app_id)
+            if matcher.matches(app_id, category.id if category else None):
+                visible_ids.add(app_id)
+        for category_id, apps in index.apps_by_category_id.items():
+            if any(app.id in visible_ids for app in apps):
+                visible_ids.add(category_id)
+        return cls(matcher=matcher, visible_ids=frozenset(visible_ids))
+
+    def can_access(self, item_id: str) -> bool:
+        return item_id in self.visible_ids
+
+
+def build_role_permissions(roles: Dict[str, PydanticRole], index: ConfigIndex) -> Dict[str, RolePermissions]:
+    """Compiles every defined role against a config index."""
+    return {role_name: RolePermissions.build(role, index) for role_name, role in roles.items()}
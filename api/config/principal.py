@@ -0,0 +1,112 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.http import HttpRequest
+
+from .permissions import RolePermissions
+from .services import ConfigSnapshot, DEFAULT_ROLE
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_CACHE_MAX_ENTRIES = getattr(settings, 'PRINCIPAL_CACHE_MAX_ENTRIES', 10000) # Resolved (config version, header) pairs kept
+
+# Why a request's user could not be identified (Principal.failure)
+CONFIG_UNAVAILABLE = 'config_unavailable' # No config could be loaded
+REMOTE_USER_MISSING = 'remote_user_missing' # useRemoteAuth, but no Remote-User / X-Forwarded-User header
+DEFAULT_USER_MISSING = 'default_user_missing' # No remote auth, and no 'default' user configured
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    The user a request is made by, resolved from the remote-auth headers against one config snapshot.
+
+    `identifier` keys the user's settings and notification counts; it is None when the user
+    could not be identified, and `failure` says why. `email` and `role` are what the
+    configuration endpoint reports; users without a (defined) role get DEFAULT_ROLE.
+    """
+    identifier: Optional[str]
+    email: Optional[str]
+    role: str
+    permissions: Optional[RolePermissions] # Compiled permissions of `role`
+    config_version: Optional[int] # Version of the snapshot it was resolved against; None without a config
+    failure: Optional[str] = None
+
+    @property
+    def is_identified(self) -> bool:
+        return self.identifier is not None
+
+
+def remote_user_header(request: HttpRequest) -> str:
+    """The remote-auth header value (lowercased), or '' if the proxy didn't send one."""
+    return (request.META.get('HTTP_REMOTE_USER') or request.META.get('HTTP_X_FORWARDED_USER') or '').lower()
+
+
+class PrincipalResolver:
+    """
+    Resolves Principals, memoized per (config version, header value): a returning user costs one
+    dict lookup. Entries of previous config versions are dropped when a new version is seen,
+    and at most `max_entries` are kept (oldest first out).
+    """
+    def __init__(self, max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._principals: Dict[Tuple[int, str], Principal] = {}
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def resolve(self, snapshot: Optional[ConfigSnapshot], request: HttpRequest) -> Principal:
+        if snapshot is None:
+            return Principal(identifier=None, email=None, role=DEFAULT_ROLE, permissions=None, config_version=None, failure=CONFIG_UNAVAILABLE)
+
+        header = remote_user_header(request) if snapshot.config.useRemoteAuth else ''
+        key = (snapshot.version, header)
+        principal = self._principals.get(key)
+        if principal is None:
+            principal = self._build(snapshot, header)
+            with self._lock:
+                if self._version is None or snapshot.version > self._version:
+                    self._principals.clear()
+                    self._version = snapshot.version
+                if snapshot.version == self._version: # Don't cache for a request still holding an older snapshot
+                    while len(self._principals) >= self.max_entries:
+                        del self._principals[next(iter(self._principals))]
+                    self._principals[key] = principal
+        return principal
+
+    def _build(self, snapshot: ConfigSnapshot, header: str) -> Principal:
+        config = snapshot.config
+        failure = None
+        if config.useRemoteAuth:
+            identifier = header or None
+            email = identifier
+            if identifier is None:
+                failure = REMOTE_USER_MISSING
+        elif config.users and 'default' in config.users:
+            identifier = 'default'
+            email = f"{identifier}@navicula.local"
+        else:
+            identifier = email = None
+            failure = DEFAULT_USER_MISSING
+
+        role = snapshot.resolve_role(identifier)
+        user_config = config.users.get(identifier) if identifier and config.users else None
+        if user_config and user_config.role != role:
+            logger.warning(
+                f'Assigned role "{user_config.role}" for user "{identifier}" not found in roles definition. '
+                f'Falling back to "{DEFAULT_ROLE}".'
+            )
+        return Principal(
+            identifier=identifier,
+            email=email,
+            role=role,
+            permissions=snapshot.role_permissions.get(role),
+            config_version=snapshot.version,
+            failure=failure,
+        )
+
+
+# Process-wide resolver used by PrincipalMiddleware
+principal_resolver = PrincipalResolver()
@@ -1,9 +1,21 @@
+import os
+import time
 import yaml
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from pydantic import ValidationError
 
 from .schemas import Config as PydanticConfig # Alias to avoid confusion
+from .index import ConfigIndex
+from .permissions import RolePermissions
+from .payloads import RolePayload
+from .compiled import CompiledConfig, read_compiled_config, write_compiled_config
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +23,17 @@ logger = logging.getLogger(__name__)
 # For now, assuming it's in the Django project's root directory (api/)
 CONFIG_YML_PATH_DEFAULT = settings.BASE_DIR / 'config.yml' # Default if not in settings
 CONFIG_YML_PATH = getattr(settings, 'APP_CONFIG_PATH', CONFIG_YML_PATH_DEFAULT)
+# Seconds between cheap stat() checks of the config file; None disables hot-reloading
+CONFIG_RELOAD_INTERVAL = getattr(settings, 'APP_CONFIG_RELOAD_INTERVAL', None)
+# Role assumed for users that aren't configured or whose role isn't defined
+DEFAULT_ROLE = 'Guest'
+# Compiled snapshot cache file (see config.compiled); None disables it
+CONFIG_CACHE_PATH = getattr(settings, 'APP_CONFIG_CACHE_PATH', None)
+# Recent snapshots kept so clients can fetch what changed since the version they hold
+CONFIG_HISTORY_SIZE = getattr(settings, 'APP_CONFIG_HISTORY_SIZE', 10)
+
+# libyaml's C loader is an order of magnitude faster than the pure-Python one; use it when PyYAML was built with it
+YamlSafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
 
 class ConfigError(Exception):
@@ -19,29 +42,107 @@ class ConfigError(Exception):
         super().__init__(message)
         self.status_code = status_code
 
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    An immutable, versioned view of one successfully loaded config.yml.
+    `version` increases by one every time a new config is swapped in; `digest` is the
+    SHA-256 of the file contents, which identifies the config across worker processes.
+    `index`, `role_permissions` and `role_payloads` are derived from `config` once, at load time.
+    """
+    version: int
+    digest: str
+    config: PydanticConfig
+    index: ConfigIndex
+    role_permissions: Dict[str, RolePermissions] # Keyed by role name
+    role_payloads: Dict[str, RolePayload] # Keyed by role name
+
+    @property
+    def version_id(self) -> str:
+        """
+        Identifies this config to clients (`?since=` on the configuration endpoint). Derived from
+        the digest rather than `version`, which is per process, so every worker agrees on it.
+        """
+        return self.digest[:16]
+
+    def resolve_role(self, user_identifier: str | None) -> str:
+        """Returns the configured role for a user, or DEFAULT_ROLE if the user or their role is undefined."""
+        user_config = self.config.users.get(user_identifier) if user_identifier else None
+        if user_config and user_config.role in self.role_permissions:
+            return user_config.role
+        return DEFAULT_ROLE
+
+
 class ConfigService:
-    def __init__(self, config_path: str = CONFIG_YML_PATH):
+    """
+    Loads and validates config.yml, caching the result.
+
+    When `reload_interval` is set, the file is stat()ed at most once per interval
+    and only reparsed when its mtime/size/inode changed. The validated config is
+    swapped in with a single reference assignment, so concurrent readers always
+    see either the old or the new config, never a partially built one.
+    """
+    def __init__(
+        self,
+        config_path: str = CONFIG_YML_PATH,
+        reload_interval: float | None = CONFIG_RELOAD_INTERVAL,
+        cache_path: str | None = CONFIG_CACHE_PATH,
+    ):
         self.config_path = config_path
-        self._config_cache: PydanticConfig | None = None
+        self.cache_path = cache_path
+        self.reload_interval = reload_interval if reload_interval is not None and reload_interval >= 0 else None
+        self._snapshot: ConfigSnapshot | None = None
+        self._history: 'OrderedDict[str, ConfigSnapshot]' = OrderedDict() # version_id -> snapshot, oldest first
+        self._version: int = 0
+        self._file_signature: tuple | None = None # (mtime_ns, size, inode) of the file behind the cache
+        self._last_checked: float = 0.0 # time.monotonic() of the last stat() check
+        self._reload_lock = threading.Lock() # Serializes reloads; readers never take it
+
+    def _stat_signature(self) -> tuple | None:
+        """Returns a cheap change fingerprint for the config file, or None if it can't be stat()ed."""
+        try:
+            st = os.stat(self.config_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _reload_check_due(self) -> bool:
+        if self.reload_interval is None:
+            return False
+        return time.monotonic() - self._last_checked >= self.reload_interval
+
+    def read_config_file(self) -> tuple[bytes, str]:
+        """Returns the raw config file contents and their SHA-256 hex digest."""
+        try:
+            with open(self.config_path, 'rb') as f:
+                raw_bytes = f.read()
+        except FileNotFoundError:
+            logger.error(f"Config file not found at {self.config_path}")
+            raise ConfigError(f"Configuration file not found: {self.config_path}", status_code=500)
+        except Exception as e:
+            logger.error(f"Unexpected error reading config file at {self.config_path}: {e}")
+            raise ConfigError(f"Unexpected error reading configuration file: {e}", status_code=500)
+        return raw_bytes, hashlib.sha256(raw_bytes).hexdigest()
 
-    def _read_and_parse_yaml(self) -> dict:
+    def _parse_yaml(self, raw_bytes: bytes) -> dict:
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = raw_bytes.decode('utf-8')
             
             # Basic check for empty file to prevent YAML load error
             if not content.strip():
                 logger.error(f"Config file is empty: {self.config_path}")
                 raise ConfigError("Configuration file is empty.", status_code=500)
 
-            raw_config = yaml.safe_load(content)
+            raw_config = yaml.load(content, Loader=YamlSafeLoader)
             if not isinstance(raw_config, dict): # Ensure top level is a dict
                 logger.error(f"Config file does not contain a valid YAML dictionary: {self.config_path}")
                 raise ConfigError("Invalid configuration format: Root must be a dictionary.", status_code=500)
             return raw_config
-        except FileNotFoundError:
-            logger.error(f"Config file not found at {self.config_path}")
-            raise ConfigError(f"Configuration file not found: {self.config_path}", status_code=500)
+        except ConfigError:
+            raise
+        except UnicodeDecodeError as e:
+            logger.error(f"Config file is not valid UTF-8: {self.config_path}: {e}")
+            raise ConfigError(f"Configuration file is not valid UTF-8: {e}", status_code=500)
         except yaml.YAMLError as e:
             logger.error(f"Error parsing YAML config file at {self.config_path}: {e}")
             raise ConfigError(f"Error parsing configuration file: {e}", status_code=500)
@@ -49,17 +150,12 @@ class ConfigService:
             logger.error(f"Unexpected error reading config file at {self.config_path}: {e}")
             raise ConfigError(f"Unexpected error reading configuration file: {e}", status_code=500)
 
-    def load_config(self, force_reload: bool = False) -> PydanticConfig:
-        if self._config_cache is not None and not force_reload:
-            return self._config_cache
-
-        raw_config_data = self._read_and_parse_yaml()
+    def compile_config(self, raw_bytes: bytes) -> CompiledConfig:
+        """Fully parses, validates and compiles raw config file contents, bypassing the snapshot cache."""
+        raw_config_data = self._parse_yaml(raw_bytes)
 
         try:
             validated_config = PydanticConfig(**raw_config_data)
-            self._config_cache = validated_config
-            logger.info(f"Successfully loaded and validated configuration from {self.config_path}")
-            return validated_config
         except ValidationError as e:
             logger.error(f"Configuration validation error for {self.config_path}: {e}")
             # Provide a more user-friendly error message if possible
@@ -70,5 +166,113 @@ class ConfigService:
             logger.error(f"Unexpected error instantiating Pydantic Config model from {self.config_path}: {e}")
             raise ConfigError(f"Unexpected error processing configuration data: {e}", status_code=500)
 
-# Global instance (optional, can be instantiated in views)
-# config_service_instance = ConfigService()
+        return CompiledConfig.compile(validated_config)
+
+    def _load_compiled(self, raw_bytes: bytes, digest: str) -> CompiledConfig:
+        """Returns the compiled config for `digest` from the snapshot cache, compiling and caching it on a miss."""
+        if self.cache_path:
+            compiled = read_compiled_config(self.cache_path, digest)
+            if compiled is not None:
+                logger.info(f"Loaded compiled configuration from cache {self.cache_path}")
+                return compiled
+
+        compiled = self.compile_config(raw_bytes)
+        if self.cache_path:
+            try:
+                write_compiled_config(self.cache_path, digest, compiled)
+            except Exception as e: # The cache only speeds up the next start; never fail a load over it
+                logger.warning(f"Could not write compiled configuration cache {self.cache_path}: {e}")
+        return compiled
+
+    def load_config(self, force_reload: bool = False) -> PydanticConfig:
+        return self.get_snapshot(force_reload=force_reload).config
+
+    def get_snapshot(self, force_reload: bool = False) -> ConfigSnapshot:
+        """
+        Returns the current config snapshot, loading it on first use and, in hot-reload
+        mode, reloading it when the file changed. Raises ConfigError if no config could be loaded.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and not force_reload and not self._reload_check_due():
+            return snapshot
+
+        with self._reload_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and not force_reload:
+                # Another thread may have checked while we waited for the lock
+                if not self._reload_check_due():
+                    return snapshot
+                self._last_checked = time.monotonic()
+                signature = self._stat_signature()
+                if signature == self._file_signature:
+                    return snapshot
+                try:
+                    return self._load_and_swap(signature)
+                except ConfigError as e:
+                    # Keep serving the last good config while the file is broken (e.g. mid-edit).
+                    # Remember the signature so the broken file is only reparsed once it changes again.
+                    self._file_signature = signature
+                    logger.error(f"Config file changed but could not be reloaded, keeping previous configuration: {e}")
+                    return snapshot
+
+            self._last_checked = time.monotonic()
+            return self._load_and_swap(self._stat_signature())
+
+    async def aget_snapshot(self, force_reload: bool = False) -> ConfigSnapshot:
+        """
+        get_snapshot for async code. Returns the current snapshot without blocking; only when a
+        reload check (a stat(), maybe a reparse) is due does that run in a worker thread.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and not force_reload and not self._reload_check_due():
+            return snapshot
+        return await sync_to_async(self.get_snapshot, thread_sensitive=False)(force_reload)
+
+    def _remember(self, snapshot: ConfigSnapshot):
+        """Adds a snapshot to the bounded history (called under the reload lock)."""
+        self._history.pop(snapshot.version_id, None) # A config reverted to an earlier version becomes the newest entry
+        self._history[snapshot.version_id] = snapshot
+        while len(self._history) > max(1, CONFIG_HISTORY_SIZE):
+            self._history.popitem(last=False)
+
+    def snapshot_at(self, version_id: str) -> ConfigSnapshot | None:
+        """Returns a recent snapshot by its version_id, or None if it is unknown or was evicted from the history."""
+        return self._history.get(version_id)
+
+    def _load_and_swap(self, signature: tuple | None) -> ConfigSnapshot:
+        """Reads, parses and validates the config file, then atomically replaces the current snapshot."""
+        raw_bytes, digest = self.read_config_file()
+        if self._snapshot is not None and self._snapshot.digest == digest:
+            # Touched but unchanged (e.g. an editor rewrote the same bytes): keep the current version
+            self._file_signature = signature
+            return self._snapshot
+
+        compiled = self._load_compiled(raw_bytes, digest)
+        self._version += 1
+        snapshot = ConfigSnapshot(
+            version=self._version,
+            digest=digest,
+            config=compiled.config,
+            index=compiled.index,
+            role_permissions=compiled.role_permissions,
+            role_payloads=compiled.role_payloads,
+        )
+        self._snapshot = snapshot
+        self._remember(snapshot)
+        self._file_signature = signature
+        logger.info(f"Successfully loaded and validated configuration version {snapshot.version} from {self.config_path}")
+        return snapshot
+
+# Process-wide instance: every view, serializer and service reads its snapshot from here,
+# so each worker holds one parsed copy of config.yml and all callers agree on its version.
+config_service_instance = ConfigService()
+
+
+def get_config_service() -> ConfigService:
+    """Returns the process-wide ConfigService."""
+    return config_service_instance
+
+
+def get_config_snapshot(force_reload: bool = False) -> ConfigSnapshot:
+    """Returns the current process-wide config snapshot. Raises ConfigError if it can't be loaded."""
+    return config_service_instance.get_snapshot(force_reload=force_reload)
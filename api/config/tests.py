@@ -1,3 +1,177 @@
-from django.test import TestCase
+import os
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
 
-# Create your tests here.
+import yaml
+from django.test import RequestFactory, SimpleTestCase
+
+from .index import ConfigIndex
+from .payloads import navigation_delta
+from .permissions import PermissionMatcher, RolePermissions
+from .principal import PrincipalResolver
+from .schemas import Config
+from .services import ConfigService, get_config_service
+
+
+def sample_config(**overrides) -> dict:
+    config = {
+        'roles': {
+            'Admin': {'permissions': ['*']},
+            'Media': {'permissions': ['cat-media', '!app-plex']},
+        },
+        'users': {
+            'default': {'role': 'Admin'},
+            'media@example.com': {'role': 'Media'},
+        },
+        'navigationItems': [
+            {'id': 'app-dashboard', 'title': 'Dashboard', 'icon': 'dashboard', 'url': '/dashboard'},
+            {'id': 'cat-media', 'title': 'Media', 'icon': 'movie', 'apps': [
+                {'id': 'app-plex', 'title': 'Plex', 'icon': 'tv', 'url': 'https://plex.example.com'},
+                {'id': 'app-sonarr', 'title': 'Sonarr', 'icon': 'tv', 'url': 'https://sonarr.example.com'},
+                {'id': 'app-radarr', 'title': 'Radarr', 'icon': 'movie', 'url': 'https://radarr.example.com'},
+            ]},
+        ],
+    }
+    config.update(overrides)
+    return config
+
+
+def write_config(path: str, config: dict):
+    with open(path, 'w') as f:
+        yaml.safe_dump(config, f)
+
+
+@contextmanager
+def use_config(config: dict):
+    """Points the process-wide ConfigService at a temporary config file for the duration of the block."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'config.yml')
+        write_config(path, config)
+        service = get_config_service()
+        with mock.patch.multiple(service, config_path=path, cache_path=None, reload_interval=None, _snapshot=None):
+            service.get_snapshot()
+            yield service
+
+
+class PermissionMatcherTests(SimpleTestCase):
+    def test_explicit_app_allow_beats_category_deny(self):
+        matcher = PermissionMatcher(['!cat-media', 'app-plex'])
+        self.assertTrue(matcher.matches('app-plex', 'cat-media'))
+        self.assertFalse(matcher.matches('app-sonarr', 'cat-media'))
+
+    def test_explicit_app_deny_beats_category_allow(self):
+        matcher = PermissionMatcher(['cat-media', '!app-plex'])
+        self.assertFalse(matcher.matches('app-plex', 'cat-media'))
+        self.assertTrue(matcher.matches('app-sonarr', 'cat-media'))
+        self.assertFalse(matcher.matches('app-dashboard'))
+
+    def test_deny_beats_glob_grant(self):
+        matcher = PermissionMatcher(['app-*arr', '!app-radarr'])
+        self.assertTrue(matcher.matches('app-sonarr', 'cat-media'))
+        self.assertFalse(matcher.matches('app-radarr', 'cat-media'))
+        self.assertFalse(matcher.matches('app-plex', 'cat-media'))
+
+    def test_wildcard_grants_everything_not_denied(self):
+        matcher = PermissionMatcher(['*', '!cat-media', 'app-plex'])
+        self.assertTrue(matcher.matches('app-dashboard'))
+        self.assertTrue(matcher.matches('app-plex', 'cat-media'))
+        self.assertFalse(matcher.matches('app-sonarr', 'cat-media'))
+
+    def test_role_visibility_includes_categories_with_visible_apps(self):
+        config = Config(**sample_config())
+        permissions = RolePermissions.build(config.roles['Media'], ConfigIndex.build(config))
+        self.assertEqual(permissions.visible_ids, {'cat-media', 'app-sonarr', 'app-radarr'})
+
+
+class ConfigDeltaTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'config.yml')
+        write_config(self.path, sample_config())
+        self.service = ConfigService(config_path=self.path, reload_interval=None, cache_path=None)
+
+    @staticmethod
+    def apply_delta(items: list, delta: dict) -> list:
+        """Applies a navigation_delta the way a client would."""
+        by_id = {item['id']: item for item in items if item['id'] not in delta['removed']}
+        by_id.update((item['id'], item) for item in delta['upserted'])
+        for category_id, changes in delta['categories'].items():
+            category = dict(changes.get('fields', by_id[category_id]))
+            apps = {app['id']: app for app in by_id[category_id]['apps'] if app['id'] not in changes['removed']}
+            apps.update((app['id'], app) for app in changes['upserted'])
+            category['apps'] = [apps[app_id] for app_id in changes.get('appOrder', apps)]
+            by_id[category_id] = category
+        return [by_id[item_id] for item_id in delta['order']]
+
+    def test_delta_round_trip_after_config_change(self):
+        old = self.service.get_snapshot()
+        config = sample_config()
+        navigation = config['navigationItems']
+        navigation[1]['title'] = 'Movies & TV'
+        navigation[1]['apps'][1]['url'] = 'https://sonarr.example.com/new'
+        navigation[1]['apps'].reverse()
+        navigation.append({'id': 'app-wiki', 'title': 'Wiki', 'icon': 'book', 'url': 'https://wiki.example.com'})
+        del navigation[0]
+        write_config(self.path, config)
+        new = self.service.get_snapshot(force_reload=True)
+
+        self.assertNotEqual(old.version_id, new.version_id)
+        self.assertIs(self.service.snapshot_at(old.version_id), old)
+        for role in ('Admin', 'Media'):
+            old_items = old.role_payloads[role].navigation_items
+            new_items = new.role_payloads[role].navigation_items
+            delta = navigation_delta(old_items, new_items)
+            self.assertEqual(self.apply_delta(old_items, delta), new_items)
+
+    def test_delta_sends_only_the_changed_app(self):
+        old = self.service.get_snapshot()
+        config = sample_config()
+        config['navigationItems'][1]['apps'][2]['url'] = 'https://radarr.example.com/new'
+        write_config(self.path, config)
+        new = self.service.get_snapshot(force_reload=True)
+
+        new_items = new.role_payloads['Admin'].navigation_items
+        delta = navigation_delta(old.role_payloads['Admin'].navigation_items, new_items)
+        self.assertEqual(delta['upserted'], [])
+        self.assertEqual(delta['categories'], {'cat-media': {'upserted': [new_items[1]['apps'][2]], 'removed': []}})
+
+    def test_unchanged_file_keeps_its_version(self):
+        old = self.service.get_snapshot()
+        write_config(self.path, sample_config())
+        self.assertIs(self.service.get_snapshot(force_reload=True), old)
+
+
+class PrincipalResolverTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'config.yml')
+        write_config(self.path, sample_config(useRemoteAuth=True))
+        self.service = ConfigService(config_path=self.path, reload_interval=None, cache_path=None)
+        self.resolver = PrincipalResolver()
+        self.factory = RequestFactory()
+
+    def request(self, user: str):
+        return self.factory.get('/', HTTP_REMOTE_USER=user)
+
+    def test_principal_is_memoized_per_version_and_header(self):
+        snapshot = self.service.get_snapshot()
+        principal = self.resolver.resolve(snapshot, self.request('Media@Example.com'))
+        self.assertEqual((principal.identifier, principal.role), ('media@example.com', 'Media'))
+        self.assertIs(self.resolver.resolve(snapshot, self.request('media@example.com')), principal)
+        self.assertIsNot(self.resolver.resolve(snapshot, self.request('other@example.com')), principal)
+
+    def test_new_config_version_drops_older_principals(self):
+        old = self.service.get_snapshot()
+        self.resolver.resolve(old, self.request('media@example.com'))
+        config = sample_config(useRemoteAuth=True)
+        config['users']['media@example.com']['role'] = 'Admin'
+        write_config(self.path, config)
+        new = self.service.get_snapshot(force_reload=True)
+
+        self.assertEqual(self.resolver.resolve(new, self.request('media@example.com')).role, 'Admin')
+        self.assertEqual(list(self.resolver._principals), [(new.version, 'media@example.com')])
+        self.resolver.resolve(old, self.request('media@example.com')) # A request still holding the old snapshot
+        self.assertEqual(list(self.resolver._principals), [(new.version, 'media@example.com')])
@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.urls import path
-from .views import ConfigurationDetailView
+from .views import ConfigurationDetailView, AsyncConfigurationDetailView
 
 app_name = 'config'
 
+# Native async views when served over ASGI (see API_ASYNC_VIEWS in core/settings.py)
+ConfigView = AsyncConfigurationDetailView if settings.API_ASYNC_VIEWS else ConfigurationDetailView
+
 urlpatterns = [
-    path('configuration/', ConfigurationDetailView.as_view(), name='get_configuration'),
+    path('configuration/', ConfigView.as_view(), name='get_configuration'),
 ]
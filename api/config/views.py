@@ -1,27 +1,110 @@
 import logging
-from django.http import JsonResponse, HttpRequest
+from django.http import JsonResponse, HttpRequest, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.views import View
 from rest_framework.views import APIView
-from rest_framework.response import Response # DRF's Response handles serialization better
 from rest_framework import status
 
-from .services import ConfigService, ConfigError
-from .schemas import AppLink, NavCategory, Role as PydanticRole, UserConfig as PydanticUserConfig, Config as PydanticConfig
+from core.compression import COMPRESSION_MIN_SIZE, compressed_bodies, negotiate_encoding
+
+from .services import ConfigError, ConfigSnapshot, DEFAULT_ROLE, get_config_service
+from .principal import Principal, principal_resolver
+from .payloads import RolePayload, render_delta
+from .schemas import Config as PydanticConfig
 
 logger = logging.getLogger(__name__)
 
-DEFAULT_ROLE = 'Guest' # As defined in original logic
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Checks an If-None-Match header value against a strong ETag."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates
+
+
+def _delta_body(request: HttpRequest, snapshot: ConfigSnapshot, principal: Principal, role_payload: RolePayload) -> bytes | None:
+    """
+    Answers `?since=<version>` with only what changed since that version (see config.payloads.render_delta).
+    Returns None, for a full response instead, if that version is unknown to this worker or was evicted
+    from the history, or if the user's role differs between the two versions.
+    """
+    since_snapshot = get_config_service().snapshot_at(request.GET.get('since', ''))
+    if since_snapshot is None:
+        return None
+    since_payload = since_snapshot.role_payloads.get(principal_resolver.resolve(since_snapshot, request).role)
+    if since_payload is None or since_payload.role != role_payload.role:
+        return None
+    return render_delta(principal.email, snapshot.config, role_payload, snapshot.version_id, since_payload, since_snapshot.version_id)
+
+
+def configuration_response(request: HttpRequest, snapshot: ConfigSnapshot) -> HttpResponse:
+    """
+    Builds the configuration response for the requesting user from a loaded snapshot.
+    Pure CPU work on precomputed payloads, so sync and async views share it.
+    With `?since=<version>` (the X-Config-Version of an earlier response), only the changes
+    to the navigation items are sent when possible.
+    """
+    config: PydanticConfig = snapshot.config
+
+    # User and role were resolved once for this request by config.middleware.PrincipalMiddleware
+    principal: Principal = request.principal
+    if principal.config_version != snapshot.version: # The config was reloaded in between
+        principal = principal_resolver.resolve(snapshot, request)
+    user_email = principal.email
+    user_role_name = principal.role
+    role_payload = snapshot.role_payloads.get(user_role_name)
+
+    if not role_payload:
+        logger.error(f'Default role "{DEFAULT_ROLE}" or assigned role "{user_role_name}" not found in config')
+        return JsonResponse({
+            'error': 'Server configuration error: Role definition missing',
+            'userEmail': user_email,
+            'role': DEFAULT_ROLE,
+            'navigationItems': [],
+            'defaultToolbarColor': config.defaultToolbarColor,
+            'keybindings': config.keybindings,
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    delta = _delta_body(request, snapshot, principal, role_payload) if 'since' in request.GET else None
+    since_id = request.GET['since'] if delta is not None else None # Base version of a delta response
+    body = role_payload.render(user_email) if delta is None else delta
+    encoding = negotiate_encoding(request) if len(body) >= COMPRESSION_MIN_SIZE else None
+    etag = role_payload.etag(snapshot.digest, user_email)
+    if since_id:
+        etag = f'{etag[:-1]}-since-{since_id}"' # A delta is a different representation, too
+    if encoding:
+        etag = f'{etag[:-1]}-{encoding}"' # Each encoding is a different representation
+    if _etag_matches(request.META.get('HTTP_IF_NONE_MATCH', ''), etag):
+        response = HttpResponseNotModified()
+    else:
+        if encoding:
+            # Compressed once per config version and user (the body carries the email), encoding and delta
+            # base, then served from memory; see API_COMPRESSION_CACHE_MAX_ENTRIES for sizing
+            body = compressed_bodies.get_or_compress((snapshot.digest, user_role_name, user_email, since_id), encoding, body)
+        response = HttpResponse(body, content_type='application/json')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['X-Config-Version'] = snapshot.version_id # For `?since=` on the next request
+    # Always revalidate, and never reuse one user's cached response for another
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ('Remote-User', 'X-Forwarded-User', 'Accept-Encoding'))
+    return response
+
 
 class ConfigurationDetailView(APIView):
     """
     API view to retrieve the application configuration.
     It processes a YAML configuration file, determines user context,
-    and filters navigation items based on user roles and permissions.
+    and serves the navigation items precomputed for the user's role
+    (see config.payloads), with ETag/If-None-Match revalidation.
     """
-    config_service = ConfigService() # Can be instantiated per request or globally
+    config_service = get_config_service() # Process-wide shared instance
 
     def get(self, request: HttpRequest, *args, **kwargs):
         try:
-            config: PydanticConfig = self.config_service.load_config()
+            snapshot: ConfigSnapshot = self.config_service.get_snapshot()
         except ConfigError as e:
             logger.error(f"Configuration loading failed: {e}")
             return JsonResponse({'error': str(e)}, status=e.status_code)
@@ -29,81 +112,25 @@ class ConfigurationDetailView(APIView):
             logger.error(f"Unexpected error during configuration loading: {e}")
             return JsonResponse({'error': 'An unexpected server error occurred.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # --- User Identification & Role Calculation ---
-        user_email: str | None = None
-        user_identifier: str | None = None
-        # user_pydantic_config: PydanticUserConfig | None = None # From Pydantic model
-        user_role_name: str
-
-        if config.useRemoteAuth:
-            user_email_header = (
-                request.META.get('HTTP_REMOTE_USER') or
-                request.META.get('HTTP_X_FORWARDED_USER') or
-                ''
-            ).lower()
-            user_email = user_email_header or None
-            user_identifier = user_email
-            user_pydantic_config = config.users.get(user_identifier) if user_identifier and config.users else None
-            user_role_name = user_pydantic_config.role if user_pydantic_config else DEFAULT_ROLE
-        else:
-            user_identifier = 'default'
-            user_pydantic_config = config.users.get(user_identifier) if config.users else None
-            user_role_name = user_pydantic_config.role if user_pydantic_config else DEFAULT_ROLE
-            user_email = f"{user_identifier}@navicula.local" if user_pydantic_config else None
-        
-        user_pydantic_role: PydanticRole | None = config.roles.get(user_role_name) if config.roles else None
-
-        if not user_pydantic_role:
-            logger.warning(
-                f'Assigned role "{user_role_name}" for user "{user_identifier}" not found in roles definition. '
-                f'Falling back to "{DEFAULT_ROLE}".'
-            )
-            user_role_name = DEFAULT_ROLE
-            user_pydantic_role = config.roles.get(DEFAULT_ROLE) if config.roles else None
-
-        if not user_pydantic_role:
-            logger.error(f'Default role "{DEFAULT_ROLE}" or assigned role "{user_role_name}" not found in config')
-            return JsonResponse({
-                'error': 'Server configuration error: Role definition missing',
-                'userEmail': user_email,
-                'role': DEFAULT_ROLE,
-                'navigationItems': [],
-                'defaultToolbarColor': config.defaultToolbarColor,
-                'keybindings': config.keybindings,
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        user_permissions = set(user_pydantic_role.permissions)
-        has_wildcard = '*' in user_permissions
-
-        # --- Filtering Navigation Items ---
-        accessible_navigation_items_data = []
-        for nav_item_wrapper in config.navigationItems:
-            item = nav_item_wrapper.root # Access the actual AppLink or NavCategory
-            
-            # Common properties
-            item_id = item.id
-            
-            if isinstance(item, AppLink):
-                if has_wildcard or user_permissions.has(item_id):
-                    accessible_navigation_items_data.append(item.model_dump())
-            elif isinstance(item, NavCategory):
-                can_access_category = has_wildcard or user_permissions.has(item_id)
-                accessible_apps_data = []
-                for app in item.apps:
-                    if has_wildcard or user_permissions.has(app.id) or can_access_category:
-                        accessible_apps_data.append(app.model_dump())
-                
-                if accessible_apps_data:
-                    # Create a new dict for the category to avoid modifying original Pydantic model
-                    category_data = item.model_dump()
-                    category_data['apps'] = accessible_apps_data
-                    accessible_navigation_items_data.append(category_data)
-        
-        response_data = {
-            'userEmail': user_email,
-            'role': user_role_name,
-            'navigationItems': accessible_navigation_items_data,
-            'defaultToolbarColor': config.defaultToolbarColor,
-            'keybindings': config.keybindings,
-        }
-        return Response(response_data, status=status.HTTP_200_OK)
+        return configuration_response(request, snapshot)
+
+
+class AsyncConfigurationDetailView(View):
+    """
+    Native async version of ConfigurationDetailView, routed instead of it when the API is
+    served over ASGI (settings.API_ASYNC_VIEWS). Never blocks the event loop: the snapshot is
+    read without I/O except when a reload check is due, which then runs in a worker thread.
+    """
+    config_service = get_config_service()
+
+    async def get(self, request: HttpRequest, *args, **kwargs):
+        try:
+            snapshot: ConfigSnapshot = await self.config_service.aget_snapshot()
+        except ConfigError as e:
+            logger.error(f"Configuration loading failed: {e}")
+            return JsonResponse({'error': str(e)}, status=e.status_code)
+        except Exception as e: # Catch any other unexpected error
+            logger.error(f"Unexpected error during configuration loading: {e}")
+            return JsonResponse({'error': 'An unexpected server error occurred.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return configuration_response(request, snapshot)
@@ -0,0 +1,116 @@
+import gzip
+import importlib
+import importlib.util
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from django.conf import settings
+from django.http import HttpRequest
+
+# brotli is optional (pip install brotli); without it only gzip is offered
+brotli = importlib.import_module('brotli') if importlib.util.find_spec('brotli') else None
+
+COMPRESSION_MIN_SIZE = getattr(settings, 'API_COMPRESSION_MIN_SIZE', 1024) # Bytes; smaller bodies are sent as is
+GZIP_LEVEL = getattr(settings, 'API_GZIP_LEVEL', 6) # 1 (fastest) - 9 (smallest)
+BROTLI_LEVEL = getattr(settings, 'API_BROTLI_LEVEL', 5) # 0 (fastest) - 11 (smallest)
+COMPRESSION_CACHE_MAX_ENTRIES = getattr(settings, 'API_COMPRESSION_CACHE_MAX_ENTRIES', 10000) # Compressed bodies kept
+COMPRESSION_CACHE_MAX_BYTES = getattr(settings, 'API_COMPRESSION_CACHE_MAX_BYTES', 32 * 1024 * 1024) # Their total size
+
+BROTLI = 'br'
+GZIP = 'gzip'
+
+
+def _compressors() -> dict:
+    compressors = {GZIP: lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        compressors[BROTLI] = lambda body: brotli.compress(body, quality=BROTLI_LEVEL)
+    return compressors
+
+
+COMPRESSORS = _compressors() # Content-Encoding -> compress function
+PREFERENCE = (BROTLI, GZIP) # Among equally weighted encodings, the smaller output wins
+
+
+def negotiate_encoding(request: HttpRequest) -> Optional[str]:
+    """
+    Picks the Content-Encoding for a response from the request's Accept-Encoding header:
+    the supported encoding with the highest q-value (brotli before gzip on ties), or None
+    to send the body uncompressed.
+    """
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if not header:
+        return None
+    weights = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding] = quality
+    wildcard = weights.get('*', 0.0)
+    candidates = [
+        (weights.get(coding, wildcard), -PREFERENCE.index(coding), coding)
+        for coding in PREFERENCE if coding in COMPRESSORS
+    ]
+    quality, _, coding = max(candidates)
+    return coding if quality > 0 else None
+
+
+class CompressedBodyCache:
+    """
+    A thread-safe LRU cache of compressed response bodies, for payloads that are served
+    repeatedly (e.g. a user's configuration for one config version). Each (key, encoding) is
+    compressed once; the key must change whenever the body does. Bounded both in entries and
+    in total bytes, since bodies that embed per-user fields need one entry per user.
+    """
+    def __init__(self, max_entries: int = COMPRESSION_CACHE_MAX_ENTRIES, max_bytes: int = COMPRESSION_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Tuple[Hashable, str], bytes]' = OrderedDict()
+        self._size = 0 # Total bytes of the cached bodies
+        self._lock = threading.Lock()
+
+    def get_or_compress(self, key: Hashable, encoding: str, body: bytes) -> bytes:
+        """Returns the body for `key` compressed with `encoding`, compressing (and storing) it on first use."""
+        cache_key = (key, encoding)
+        with self._lock:
+            compressed = self._entries.get(cache_key)
+            if compressed is not None:
+                self._entries.move_to_end(cache_key)
+                return compressed
+        compressed = COMPRESSORS[encoding](body)
+        if len(compressed) > self.max_bytes:
+            return compressed # Would evict everything else; serve it uncached
+        with self._lock:
+            previous = self._entries.pop(cache_key, None) # Compressed concurrently by another thread
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[cache_key] = compressed
+            self._size += len(compressed)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False) # Evict the least recently used entry
+                self._size -= len(evicted)
+        return compressed
+
+    @property
+    def size(self) -> int:
+        """Total bytes of the cached bodies."""
+        return self._size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Process-wide cache of precompressed response bodies
+compressed_bodies = CompressedBodyCache()
@@ -0,0 +1,14 @@
+from django.http import HttpRequest
+
+
+def parse_app_ids(request: HttpRequest) -> list[str]:
+    """
+    Reads `?app_ids=a,b,c` (or repeated `app_ids` parameters) from a request, skipping blank
+    items and duplicates, in the order given. Shared by the endpoints that take many apps.
+    """
+    return list(dict.fromkeys(
+        app_id.strip()
+        for value in request.GET.getlist('app_ids')
+        for app_id in value.split(',')
+        if app_id.strip()
+    ))
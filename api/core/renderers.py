@@ -0,0 +1,46 @@
+import json
+import importlib
+import importlib.util
+from typing import Any
+
+import pydantic_core
+from django.http import HttpResponse
+from pydantic import BaseModel
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# orjson is optional (pip install orjson); without it everything falls back to the stdlib json module
+orjson = importlib.import_module('orjson') if importlib.util.find_spec('orjson') else None
+
+
+def dump_json(data: Any) -> bytes:
+    """
+    Serializes data like DRF's JSONRenderer does (compact, UTF-8, DRF's encoder for dates, UUIDs etc.),
+    with orjson when it is installed.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=JSONEncoder().default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError: # e.g. integers beyond 64 bits, which only the stdlib encoder handles
+            pass
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson; used as the default renderer when orjson is installed (see core/settings.py)."""
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            # Indented output (requested via `Accept: application/json; indent=4`) is for humans; keep DRF's formatting
+            return super().render(data, accepted_media_type, renderer_context)
+        return dump_json(data)
+
+
+def pydantic_response(model: BaseModel, status: int = 200) -> HttpResponse:
+    """
+    A JSON response serialized straight from a Pydantic model to bytes by its compiled serializer
+    (what model_dump_json does, minus the str round trip), without the intermediate dict and
+    renderer pass of `Response(model.model_dump())`.
+    """
+    return HttpResponse(pydantic_core.to_json(model), status=status, content_type='application/json')
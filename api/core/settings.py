@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os # For reading environment variables
+import importlib.util
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -55,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'config.middleware.PrincipalMiddleware', # Sets request.principal (who is asking, with which role)
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -74,6 +76,25 @@ TEMPLATES = [
     },
 ]
 
+# API mode: the /api/ endpoints identify users by proxy headers (Remote-User), so they need no sessions,
+# CSRF, auth or message middleware, nor the admin, sessions and messages apps. API_MODE=true drops all of
+# those for a shorter request path and a faster start; the admin is then served by a separate worker
+# running without API_MODE (see ADMIN_PORT in bin/entrypoint.sh).
+API_MODE = os.environ.get('API_MODE', 'false').lower() == 'true'
+
+if API_MODE:
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS
+        if app not in ('django.contrib.admin', 'django.contrib.sessions', 'django.contrib.messages')
+    ]
+    MIDDLEWARE = [
+        'corsheaders.middleware.CorsMiddleware',
+        'django.middleware.security.SecurityMiddleware',
+        'django.middleware.common.CommonMiddleware',
+        'config.middleware.PrincipalMiddleware',
+    ]
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove('django.contrib.messages.context_processors.messages')
+
 WSGI_APPLICATION = 'core.wsgi.application'
 
 
@@ -129,8 +150,31 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# DRF renders JSON with orjson when it is installed (core.renderers). Its browsable HTML API is for
+# development only; enable it with API_BROWSABLE=true.
+API_BROWSABLE = os.environ.get('API_BROWSABLE', 'false').lower() == 'true'
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer' if importlib.util.find_spec('orjson') else 'rest_framework.renderers.JSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if API_BROWSABLE else []),
+}
+if API_MODE:
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'] = [] # Users are identified from headers by PrincipalMiddleware
+
+# Compression of cacheable responses (the per-role configuration payload), negotiated via Accept-Encoding.
+# Bodies are compressed once per config version and user, then served from memory (see core.compression).
+# Brotli is offered when the optional `brotli` package is installed; gzip always.
+API_COMPRESSION_MIN_SIZE = int(os.environ.get('API_COMPRESSION_MIN_SIZE', '1024')) # Bytes; smaller bodies are sent as is
+API_GZIP_LEVEL = int(os.environ.get('API_GZIP_LEVEL', '6')) # 1-9
+API_BROTLI_LEVEL = int(os.environ.get('API_BROTLI_LEVEL', '5')) # 0-11
+# The configuration body carries the user's email, so the cache holds one entry per active user, encoding and
+# config version (and `?since=` base); size it for the number of users, not roles. The byte limit bounds memory.
+API_COMPRESSION_CACHE_MAX_ENTRIES = int(os.environ.get('API_COMPRESSION_CACHE_MAX_ENTRIES', '10000')) # Compressed bodies kept in memory
+API_COMPRESSION_CACHE_MAX_BYTES = int(os.environ.get('API_COMPRESSION_CACHE_MAX_BYTES', str(32 * 1024 * 1024))) # Their total size
+
 # CORS settings - for development, allow all. For production, restrict this.
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = ['X-Config-Version'] # Read by clients for `?since=` delta configuration updates
 # Alternatively, for specific origins:
 # CORS_ALLOWED_ORIGINS = [
 #    "http://localhost:3000", # Assuming Nuxt runs on port 3000
@@ -138,4 +182,36 @@ CORS_ALLOW_ALL_ORIGINS = True
 # ]
 # CORS_ALLOW_CREDENTIALS = True # If you need to send cookies or auth headers
 
+# How the API is served: 'wsgi' (gunicorn, sync DRF views) or 'asgi' (uvicorn, native async views
+# for the config, notifications and settings endpoints). See bin/entrypoint.sh.
+API_SERVER = os.environ.get('API_SERVER', 'wsgi').lower()
+API_ASYNC_VIEWS = API_SERVER == 'asgi'
+
 # Manual encryption for UserApplicationSetting.settings will use settings.SECRET_KEY.
+# To rotate keys, list the secrets newest first in FIELD_ENCRYPTION_KEYS (comma-separated; default:
+# SECRET_KEY, then SECRET_KEY_FALLBACKS). The first one encrypts, all of them decrypt; then run
+# `manage.py reencrypt_settings` and drop the old secrets once it has finished.
+FIELD_ENCRYPTION_KEYS = [key for key in os.environ.get('FIELD_ENCRYPTION_KEYS', '').split(',') if key]
+
+# Opt-in in-memory cache of decrypted UserApplicationSetting.settings, bounded in size and age (see users.fields).
+ENCRYPTED_FIELD_CACHE_ENABLED = os.environ.get('ENCRYPTED_FIELD_CACHE_ENABLED', 'false').lower() == 'true'
+ENCRYPTED_FIELD_CACHE_MAX_ENTRIES = int(os.environ.get('ENCRYPTED_FIELD_CACHE_MAX_ENTRIES', '1000'))
+ENCRYPTED_FIELD_CACHE_TTL = float(os.environ.get('ENCRYPTED_FIELD_CACHE_TTL', '300'))
+
+# Whether the background notification poller runs (started by bin/entrypoint.sh); the notifications
+# endpoints only read its count store when it does.
+NOTIFICATIONS_POLLER = os.environ.get('NOTIFICATIONS_POLLER', 'false').lower() == 'true'
+
+# Seconds a user's UserApplicationSetting rows, loaded together in one query, are reused across requests (0: per call).
+USER_SETTINGS_CACHE_TTL = float(os.environ.get('USER_SETTINGS_CACHE_TTL', '5'))
+
+# Seconds between checks of config.yml for changes (a cheap stat(), reparsed only when it changed).
+# Set APP_CONFIG_RELOAD_INTERVAL to an empty string to disable hot-reloading.
+APP_CONFIG_RELOAD_INTERVAL = float(os.environ.get('APP_CONFIG_RELOAD_INTERVAL', '5') or -1)
+
+# Recent config versions kept in memory so the configuration endpoint can answer `?since=<version>` with a delta.
+APP_CONFIG_HISTORY_SIZE = int(os.environ.get('APP_CONFIG_HISTORY_SIZE', '10'))
+
+# Where the validated, compiled form of config.yml is cached (keyed by its content hash) for fast worker starts.
+# Build it ahead of time with `manage.py compile_config`; set APP_CONFIG_CACHE_PATH to an empty string to disable.
+APP_CONFIG_CACHE_PATH = os.environ.get('APP_CONFIG_CACHE_PATH', str(BASE_DIR / '.cache' / 'config.pickle')) or None
@@ -14,12 +14,15 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include # Added include
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('api/config/', include('config.urls')),
     path('api/users/', include('users.urls')),
     path('api/notifications/', include('notifications.urls')), # Added notifications app urls
 ]
+
+if not settings.API_MODE:
+    from django.contrib import admin # Only imported (and the apps' admin modules discovered) outside API mode
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
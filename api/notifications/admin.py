@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import NotificationCountRecord
 
-# Register your models here.
+@admin.register(NotificationCountRecord)
+class NotificationCountRecordAdmin(admin.ModelAdmin):
+    list_display = ('user_identifier', 'app_id', 'count', 'error', 'fetched_at', 'changed_at')
+    list_filter = ('app_id', 'error')
+    search_fields = ('user_identifier', 'app_id')
+    readonly_fields = ('fetched_at', 'changed_at')
@@ -0,0 +1,120 @@
+import time
+import logging
+import threading
+from typing import Any, Dict, List
+
+from django.conf import settings
+
+from .clients import origin_of
+
+logger = logging.getLogger(__name__)
+
+FAILURE_THRESHOLD = getattr(settings, 'NOTIFICATIONS_BREAKER_THRESHOLD', 5) # Consecutive failures that open a circuit
+COOLDOWN = getattr(settings, 'NOTIFICATIONS_BREAKER_COOLDOWN', 30.0) # Seconds an open circuit waits before a probe
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Tracks the health of one upstream origin.
+
+    Closed: requests flow; consecutive failures (timeouts, connection errors, 5xx) are counted.
+    Open: after `failure_threshold` of them, requests are refused without touching the network.
+    Half-open: once `cooldown` has passed, exactly one probe request is let through; its success
+    closes the circuit, its failure opens it for another cooldown.
+    """
+    def __init__(self, origin: str, failure_threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN):
+        self.origin = origin
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None # time.monotonic()
+        self.last_failure_at: float | None = None # time.time(), for operators
+        self._probe_started_at: float | None = None # time.monotonic() of the half-open probe in flight
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._probe_started_at = None
+            # A probe that never reported back (e.g. its request was cancelled) is given up on after a cooldown
+            probe_lost = self._probe_started_at is not None and now - self._probe_started_at >= self.cooldown
+            if self.state == HALF_OPEN and (self._probe_started_at is None or probe_lost):
+                self._probe_started_at = now
+                logger.info(f"Circuit for {self.origin} is half-open; sending a probe request.")
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.origin} closed; upstream recovered.")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._probe_started_at = None
+
+    def release_probe(self):
+        """Frees the half-open probe slot for a request that ended without a verdict (e.g. it was cancelled)."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_failure_at = time.time()
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(
+                        f"Circuit for {self.origin} opened after {self.consecutive_failures} consecutive failures; "
+                        f"refusing requests for {self.cooldown}s."
+                    )
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._probe_started_at = None
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, round(self.cooldown - (time.monotonic() - self.opened_at), 1))
+            return {
+                'origin': self.origin,
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'last_failure_at': self.last_failure_at,
+                'retry_in': retry_in,
+            }
+
+
+class CircuitBreakerRegistry:
+    """One CircuitBreaker per upstream origin, created on first use."""
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url: str) -> CircuitBreaker:
+        origin = origin_of(url)
+        breaker = self._breakers.get(origin)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(origin, CircuitBreaker(origin, self.failure_threshold, self.cooldown))
+        return breaker
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [breaker.status() for breaker in sorted(self._breakers.values(), key=lambda b: b.origin)]
+
+
+# Process-wide registry shared by every NotificationService
+circuit_breakers = CircuitBreakerRegistry()
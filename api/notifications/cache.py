@@ -0,0 +1,122 @@
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+from .schemas import NotificationCountResponse
+from .providers import provider_registry
+
+CacheKey = Tuple[str, str] # (user_identifier, app_id)
+
+CACHE_ENABLED = getattr(settings, 'NOTIFICATIONS_CACHE_ENABLED', True)
+MAX_ENTRIES = getattr(settings, 'NOTIFICATIONS_CACHE_MAX_ENTRIES', 10000)
+DEFAULT_TTL = getattr(settings, 'NOTIFICATIONS_CACHE_TTL', 30.0) # Seconds a count is served without refreshing
+# AppLink.type -> TTL, overriding the provider's declared default_ttl
+PROVIDER_TTLS: Dict[str, float] = getattr(settings, 'NOTIFICATIONS_CACHE_PROVIDER_TTLS', {})
+ERROR_TTL = getattr(settings, 'NOTIFICATIONS_CACHE_ERROR_TTL', 10.0) # Shorter TTL for error results
+STALE_TTL = getattr(settings, 'NOTIFICATIONS_CACHE_STALE_TTL', 300.0) # How long past its TTL an entry may be served while refreshing
+
+# Values of NotificationCountResponse.cache
+CACHE_HIT = 'hit'
+CACHE_STALE = 'stale'
+CACHE_MISS = 'miss'
+CACHE_STORE = 'store' # Read from the background poller's store (NotificationCountRecord)
+
+
+def ttl_for(app_type: Optional[str], response: NotificationCountResponse) -> float:
+    """
+    Returns how long a result stays fresh: errors use ERROR_TTL, counts the configured per-type TTL,
+    else the provider's declared default TTL, else DEFAULT_TTL.
+    """
+    if response.error:
+        return ERROR_TTL
+    if app_type in PROVIDER_TTLS:
+        return PROVIDER_TTLS[app_type]
+    provider = provider_registry.get(app_type)
+    return provider.capabilities.default_ttl if provider else DEFAULT_TTL
+
+
+@dataclass
+class _CacheEntry:
+    response: NotificationCountResponse
+    fresh_until: float
+    stale_until: float
+    refreshing: bool = False
+
+
+class NotificationCountCache:
+    """
+    A thread-safe, size-bounded LRU cache of notification counts per (user_identifier, app_id).
+
+    Entries are fresh for their TTL and can then be served stale for `stale_ttl` more seconds
+    while exactly one caller refreshes them in the background (stale-while-revalidate).
+    """
+    def __init__(self, max_entries: int = MAX_ENTRIES, stale_ttl: float = STALE_TTL):
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._entries: 'OrderedDict[CacheKey, _CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: CacheKey) -> Tuple[Optional[NotificationCountResponse], Optional[str], bool]:
+        """
+        Returns `(response, state, should_refresh)`. `state` is CACHE_HIT, CACHE_STALE or None on a miss.
+        `should_refresh` is True for exactly one caller per stale entry, which must then call `set`
+        (or `release`) once its background refresh finishes.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None, False
+            if now >= entry.stale_until:
+                del self._entries[key]
+                return None, None, False
+            self._entries.move_to_end(key)
+            if now < entry.fresh_until:
+                return entry.response, CACHE_HIT, False
+            should_refresh = not entry.refreshing
+            entry.refreshing = True
+            return entry.response, CACHE_STALE, should_refresh
+
+    def set(self, key: CacheKey, response: NotificationCountResponse, ttl: float):
+        fresh_until = time.monotonic() + ttl
+        entry = _CacheEntry(
+            response=response.model_copy(update={'cache': None}),
+            fresh_until=fresh_until,
+            stale_until=fresh_until + self.stale_ttl,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False) # Evict the least recently used entry
+
+    def release(self, key: CacheKey):
+        """Clears the refreshing mark of a stale entry whose refresh failed, so a later caller can retry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refreshing = False
+
+    def invalidate(self, user_identifier: str, app_id: Optional[str] = None):
+        """Drops a user's cached count for one app, or for all apps if `app_id` is None."""
+        with self._lock:
+            if app_id is not None:
+                self._entries.pop((user_identifier, app_id), None)
+                return
+            for key in [key for key in self._entries if key[0] == user_identifier]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Process-wide cache shared by every NotificationService
+notification_count_cache = NotificationCountCache()
@@ -0,0 +1,131 @@
+import atexit
+import asyncio
+import logging
+import threading
+import importlib.util
+import concurrent.futures
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+
+import httpx
+from django.conf import settings
+
+from config.schemas import AppLink
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+DEFAULT_TIMEOUT = 5.0 # Seconds, used when an AppLink doesn't set its own `timeout`
+MAX_CONNECTIONS = getattr(settings, 'NOTIFICATIONS_UPSTREAM_MAX_CONNECTIONS', 20) # Per origin
+MAX_KEEPALIVE_CONNECTIONS = getattr(settings, 'NOTIFICATIONS_UPSTREAM_MAX_KEEPALIVE', 10) # Per origin
+KEEPALIVE_EXPIRY = getattr(settings, 'NOTIFICATIONS_UPSTREAM_KEEPALIVE_EXPIRY', 30.0) # Seconds an idle connection is kept
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2])
+HTTP2_ENABLED = getattr(settings, 'NOTIFICATIONS_UPSTREAM_HTTP2', True) and importlib.util.find_spec('h2') is not None
+
+
+def origin_of(url: str) -> str:
+    """Returns the scheme://host:port origin a URL's connections are pooled under."""
+    parsed = httpx.URL(url)
+    return f"{parsed.scheme}://{parsed.host}:{parsed.port or (443 if parsed.scheme == 'https' else 80)}"
+
+
+def upstream_timeout(app_link: AppLink) -> float:
+    """Returns the upstream timeout for an app, from its optional `timeout` field in config.yml."""
+    value = (app_link.model_extra or {}).get('timeout')
+    if value is None:
+        return DEFAULT_TIMEOUT
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring invalid timeout {value!r} for app {app_link.id}; using {DEFAULT_TIMEOUT}s.")
+        return DEFAULT_TIMEOUT
+    return timeout if timeout > 0 else DEFAULT_TIMEOUT
+
+
+class UpstreamClientPool:
+    """
+    Long-lived, keep-alive httpx.AsyncClients, one per upstream origin.
+
+    All clients live on a single event loop running in a daemon thread, so connections
+    survive across requests no matter whether the caller is sync (a WSGI worker thread,
+    via `run`) or async (another event loop, via `run_async`). The loop starts lazily,
+    i.e. after gunicorn has forked, and is shut down cleanly at interpreter exit.
+    """
+    def __init__(
+        self,
+        max_connections: int = MAX_CONNECTIONS,
+        max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = KEEPALIVE_EXPIRY,
+        http2: bool = HTTP2_ENABLED,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self._clients: Dict[str, httpx.AsyncClient] = {} # Only touched from the pool's loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        loop = self._loop
+        if loop is not None:
+            return loop
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='notifications-upstream', daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        """Returns the pooled client for a URL's origin. Must be called from coroutines running on the pool."""
+        origin = origin_of(url)
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(limits=self.limits, http2=self.http2, timeout=DEFAULT_TIMEOUT)
+            self._clients[origin] = client
+        return client
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Runs a coroutine on the pool's loop and blocks the calling (sync) thread for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result(timeout)
+
+    def submit(self, coro: Awaitable[T]) -> 'concurrent.futures.Future[T]':
+        """Schedules a coroutine on the pool's loop without waiting for it (fire and forget)."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    async def run_async(self, coro: Awaitable[T]) -> T:
+        """Runs a coroutine on the pool's loop and awaits its result from another event loop."""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()))
+
+    async def _aclose_clients(self):
+        clients, self._clients = list(self._clients.values()), {}
+        await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+    def close(self, timeout: float = 5.0):
+        """Closes all pooled connections and stops the pool's loop."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._aclose_clients(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Error closing upstream notification clients: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        loop.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the pooled origins, for diagnostics."""
+        return {'origins': sorted(self._clients), 'http2': self.http2}
+
+
+# Process-wide pool shared by every NotificationService
+upstream_pool = UpstreamClientPool()
+atexit.register(upstream_pool.close)
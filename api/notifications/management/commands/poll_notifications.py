@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from notifications.poller import NotificationPoller
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the background notification poller: refreshes counts for every (user, app) pair "
+        "with a stored API key and writes them where the notifications endpoints read them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Poll every pair once and exit.")
+        parser.add_argument('--tick', type=float, default=1.0, help="Seconds between scheduling rounds.")
+
+    def handle(self, *args, **options):
+        poller = NotificationPoller()
+        if not options['once']:
+            poller.run_forever(tick=options['tick'])
+            return
+
+        poller.discover()
+        results = poller.poll_once(pairs=poller.pairs)
+        failed = sum(1 for response in results.values() if response.error)
+        self.stdout.write(self.style.SUCCESS(f"Polled {len(results)} (user, app) pairs, {failed} with errors."))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-17 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCountRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_identifier', models.CharField(help_text="Identifier for the user (e.g., email or 'default').", max_length=255)),
+                ('app_id', models.CharField(help_text="Identifier for the application (e.g., 'app-vikunja').", max_length=100)),
+                ('count', models.IntegerField(blank=True, null=True)),
+                ('error', models.CharField(blank=True, max_length=64, null=True)),
+                ('fetched_at', models.DateTimeField(help_text='When the upstream application was last queried.')),
+                ('changed_at', models.DateTimeField(db_index=True, help_text='When count or error last changed.')),
+            ],
+            options={
+                'verbose_name': 'Notification Count Record',
+                'verbose_name_plural': 'Notification Count Records',
+                'ordering': ['user_identifier', 'app_id'],
+                'unique_together': {('user_identifier', 'app_id')},
+            },
+        ),
+    ]
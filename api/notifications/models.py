@@ -1,3 +1,30 @@
 from django.db import models
 
-# Create your models here.
+
+class NotificationCountRecord(models.Model):
+    """
+    The latest notification count for a user in an application, written by the background
+    poller (`manage.py poll_notifications`) and read by the notifications views, so requests
+    don't have to wait on the upstream application.
+    """
+    user_identifier = models.CharField(
+        max_length=255,
+        help_text="Identifier for the user (e.g., email or 'default')."
+    )
+    app_id = models.CharField(
+        max_length=100,
+        help_text="Identifier for the application (e.g., 'app-vikunja')."
+    )
+    count = models.IntegerField(null=True, blank=True)
+    error = models.CharField(max_length=64, null=True, blank=True)
+    fetched_at = models.DateTimeField(help_text="When the upstream application was last queried.")
+    changed_at = models.DateTimeField(db_index=True, help_text="When count or error last changed.")
+
+    def __str__(self):
+        return f"Notification count for {self.user_identifier} in {self.app_id}"
+
+    class Meta:
+        verbose_name = "Notification Count Record"
+        verbose_name_plural = "Notification Count Records"
+        unique_together = ('user_identifier', 'app_id')
+        ordering = ['user_identifier', 'app_id']
@@ -0,0 +1,181 @@
+import time
+import random
+import logging
+import operator
+from functools import reduce
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from config.services import ConfigError as AppConfigError, get_config_service
+from users.models import UserApplicationSetting
+from .models import NotificationCountRecord
+from .schemas import NotificationCountResponse
+from .services import NotificationService
+
+logger = logging.getLogger(__name__)
+
+PairKey = Tuple[str, str] # (user_identifier, app_id)
+
+POLL_INTERVAL = getattr(settings, 'NOTIFICATIONS_POLL_INTERVAL', 60.0) # Seconds between polls of one (user, app)
+POLL_INTERVALS: Dict[str, float] = getattr(settings, 'NOTIFICATIONS_POLL_INTERVALS', {}) # AppLink.type -> interval
+POLL_JITTER = getattr(settings, 'NOTIFICATIONS_POLL_JITTER', 0.1) # +/- fraction of the interval
+POLL_MAX_BACKOFF = getattr(settings, 'NOTIFICATIONS_POLL_MAX_BACKOFF', 900.0) # Seconds; cap for failing apps
+POLL_CONCURRENCY = getattr(settings, 'NOTIFICATIONS_POLL_CONCURRENCY', 8)
+# Seconds between rescans of UserApplicationSetting for (user, app) pairs with API keys
+POLL_DISCOVERY_INTERVAL = getattr(settings, 'NOTIFICATIONS_POLL_DISCOVERY_INTERVAL', 60.0)
+DISCOVERY_CHUNK_SIZE = 500 # UserApplicationSetting rows fetched (and decrypted) at a time while rescanning
+# Errors that mean the upstream app is unhealthy (rather than e.g. a bad API key) and warrant backing off
+BACKOFF_ERRORS = frozenset({'timeout', 'fetch_failed', 'upstream_unavailable'})
+# Doublings of the interval after which backing off stops growing (any max_backoff is reached well before)
+MAX_BACKOFF_DOUBLINGS = 16
+
+
+@dataclass
+class _PollState:
+    next_due: float = 0.0 # time.monotonic() of the next poll
+    failures: int = 0 # Consecutive BACKOFF_ERRORS
+
+
+class NotificationPoller:
+    """
+    Periodically refreshes notification counts for every (user, app) pair that has an API key stored
+    in UserApplicationSetting, and writes them to NotificationCountRecord for the views to read.
+
+    Each pair is polled on its provider's interval (with jitter, so pairs don't synchronize),
+    with at most `concurrency` upstream requests in flight. Pairs whose upstream keeps failing
+    back off exponentially up to `max_backoff`.
+    """
+    def __init__(
+        self,
+        service: Optional[NotificationService] = None,
+        concurrency: int = POLL_CONCURRENCY,
+        default_interval: float = POLL_INTERVAL,
+        intervals: Optional[Dict[str, float]] = None,
+        jitter: float = POLL_JITTER,
+        max_backoff: float = POLL_MAX_BACKOFF,
+        discovery_interval: float = POLL_DISCOVERY_INTERVAL,
+    ):
+        self.service = service or NotificationService(cache=None)
+        self.concurrency = concurrency
+        self.default_interval = default_interval
+        self.intervals = POLL_INTERVALS if intervals is None else intervals
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.discovery_interval = discovery_interval
+        self._states: Dict[PairKey, _PollState] = {}
+        self._next_discovery = 0.0
+
+    def _interval_for(self, app_type: Optional[str], failures: int) -> float:
+        interval = self.intervals.get(app_type, self.default_interval)
+        if failures:
+            interval = min(interval * (2 ** min(failures, MAX_BACKOFF_DOUBLINGS)), max(self.max_backoff, interval))
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def discover(self):
+        """Refreshes the set of (user, app) pairs to poll and removes records of pairs that went away."""
+        self._next_discovery = time.monotonic() + self.discovery_interval
+        try:
+            config_index = get_config_service().get_snapshot().index
+        except AppConfigError as e:
+            logger.error(f"Notification poller: Could not load config, keeping previous pairs: {e}")
+            return
+
+        pairs = set()
+        settings_rows = UserApplicationSetting.objects.only('user_identifier', 'app_id', 'settings').iterator(chunk_size=DISCOVERY_CHUNK_SIZE)
+        for setting in settings_rows:
+            app_link = config_index.get_app(setting.app_id)
+            if app_link and app_link.type and (setting.settings or {}).get('api_key'):
+                pairs.add((setting.user_identifier, setting.app_id))
+
+        now = time.monotonic()
+        for pair in pairs - self._states.keys():
+            # Spread the first polls of newly discovered pairs over one interval
+            self._states[pair] = _PollState(next_due=now + random.uniform(0, self.default_interval * self.jitter))
+        removed: Dict[str, List[str]] = {}
+        for user_identifier, app_id in self._states.keys() - pairs:
+            del self._states[(user_identifier, app_id)]
+            removed.setdefault(user_identifier, []).append(app_id)
+        if removed: # One DELETE for all pairs that went away
+            NotificationCountRecord.objects.filter(reduce(operator.or_, (
+                Q(user_identifier=user_identifier, app_id__in=app_ids) for user_identifier, app_ids in removed.items()
+            ))).delete()
+        logger.info(f"Notification poller: Polling {len(self._states)} (user, app) pairs.")
+
+    @property
+    def pairs(self) -> List[PairKey]:
+        """The (user, app) pairs currently being polled."""
+        return list(self._states)
+
+    def _due_pairs(self, now: float) -> List[PairKey]:
+        return [pair for pair, state in self._states.items() if state.next_due <= now]
+
+    def poll_once(self, pairs: Optional[List[PairKey]] = None) -> Dict[PairKey, NotificationCountResponse]:
+        """Polls the given pairs (default: all due pairs) concurrently and stores the results."""
+        now = time.monotonic()
+        if now >= self._next_discovery:
+            self.discover()
+        pairs = self._due_pairs(now) if pairs is None else pairs
+        if not pairs:
+            return {}
+
+        results = self.service.fetch_counts_for_pairs(pairs, self.concurrency)
+        self._store(results)
+
+        try:
+            config_index = get_config_service().get_snapshot().index
+        except AppConfigError:
+            config_index = None
+        for pair, response in results.items():
+            app_link = config_index.get_app(pair[1]) if config_index else None
+            state = self._states.setdefault(pair, _PollState())
+            state.failures = state.failures + 1 if response.error in BACKOFF_ERRORS else 0
+            state.next_due = time.monotonic() + self._interval_for(app_link.type if app_link else None, state.failures)
+            if state.failures:
+                logger.warning(f"Notification poller: {pair[1]} failed for {pair[0]} ({response.error}), {state.failures} time(s) in a row; backing off.")
+        return results
+
+    def _store(self, results: Dict[PairKey, NotificationCountResponse]):
+        """Upserts all results in one statement, moving `changed_at` only for values that changed."""
+        now = timezone.now()
+        existing = {
+            (record.user_identifier, record.app_id): record
+            for record in NotificationCountRecord.objects.filter(
+                user_identifier__in={user_identifier for user_identifier, _ in results},
+                app_id__in={app_id for _, app_id in results},
+            )
+        }
+        records = []
+        for (user_identifier, app_id), response in results.items():
+            previous = existing.get((user_identifier, app_id))
+            changed = previous is None or previous.count != response.count or previous.error != response.error
+            records.append(NotificationCountRecord(
+                user_identifier=user_identifier,
+                app_id=app_id,
+                count=response.count,
+                error=response.error,
+                fetched_at=now,
+                changed_at=now if changed else previous.changed_at,
+            ))
+        NotificationCountRecord.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=['user_identifier', 'app_id'],
+            update_fields=['count', 'error', 'fetched_at', 'changed_at'],
+        )
+
+    def run_forever(self, tick: float = 1.0):
+        """Polls due pairs until interrupted, sleeping `tick` seconds between rounds."""
+        logger.info("Notification poller started.")
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e: # Keep polling; a broken round must not kill the scheduler
+                logger.error(f"Notification poller: Round failed: {e}")
+            finally:
+                close_old_connections()
+            time.sleep(tick)
@@ -0,0 +1,45 @@
+import logging
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .base import (
+    NotificationError, NotificationProvider, PendingFetch, ProviderCapabilities, UpstreamPage,
+    HEAD_REQUEST, COUNT_HEADER, SINGLE_PAGE, PAGINATED,
+)
+from .vikunja import VikunjaProvider
+from .jsonpath import JsonPathProvider
+
+logger = logging.getLogger(__name__)
+
+# Dotted paths of additional NotificationProvider subclasses to register, e.g. 'myapp.providers.GiteaProvider'
+EXTRA_PROVIDERS: List[str] = getattr(settings, 'NOTIFICATIONS_PROVIDERS', [])
+
+
+class ProviderRegistry:
+    """Notification providers keyed by the AppLink.type they handle."""
+    def __init__(self):
+        self._providers: Dict[str, NotificationProvider] = {}
+
+    def register(self, provider: NotificationProvider) -> NotificationProvider:
+        if provider.type in self._providers:
+            logger.warning(f"Notifications: Provider for type '{provider.type}' replaced by {type(provider).__name__}.")
+        self._providers[provider.type] = provider
+        return provider
+
+    def get(self, app_type: Optional[str]) -> Optional[NotificationProvider]:
+        return self._providers.get(app_type) if app_type else None
+
+    def types(self) -> List[str]:
+        return sorted(self._providers)
+
+    def capabilities(self) -> Dict[str, ProviderCapabilities]:
+        return {app_type: provider.capabilities for app_type, provider in sorted(self._providers.items())}
+
+
+provider_registry = ProviderRegistry()
+provider_registry.register(VikunjaProvider())
+provider_registry.register(JsonPathProvider())
+for _path in EXTRA_PROVIDERS:
+    provider_registry.register(import_string(_path)())
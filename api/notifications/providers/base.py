@@ -0,0 +1,165 @@
+import abc
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import httpx
+from django.conf import settings
+
+from config.schemas import AppLink
+from ..schemas import NotificationCountResponse
+from ..clients import upstream_pool, upstream_timeout
+from ..breaker import circuit_breakers
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from one upstream response page before giving up with `response_too_large`
+UPSTREAM_MAX_BYTES = getattr(settings, 'NOTIFICATIONS_UPSTREAM_MAX_BYTES', 2 * 1024 * 1024)
+
+# Count strategies, cheapest first
+HEAD_REQUEST = 'head' # The count is in the headers of a HEAD response
+COUNT_HEADER = 'count_header' # The count is in a response header; the body is not read
+SINGLE_PAGE = 'single_page' # The count is computed from one response body
+PAGINATED = 'paginated' # The count is computed over several pages, fetched concurrently
+
+UpstreamPage = Tuple[httpx.Response, bytes] # A response plus its (size-capped) body
+
+
+class NotificationError(Exception):
+    """Custom exception for notification fetching errors."""
+    def __init__(self, message, error_type: Optional[str] = "fetch_failed", status_code=500, upstream_responded: bool = False):
+        super().__init__(message)
+        self.error_type = error_type # e.g., 'unauthorized', 'timeout', 'config_missing'
+        self.status_code = status_code
+        self.upstream_responded = upstream_responded # Raised about a response the upstream did send (e.g. too large)
+
+
+@dataclass(frozen=True)
+class PendingFetch:
+    """Everything needed to query an app's upstream API for one user, resolved before any network I/O."""
+    user_identifier: str
+    app_link: AppLink
+    api_key: str
+
+
+@dataclass(frozen=True)
+class ProviderCapabilities:
+    """What a provider declares about itself, for callers choosing how (and how often) to fetch."""
+    count_strategy: str = SINGLE_PAGE
+    default_ttl: float = 30.0 # Seconds a count stays fresh, unless NOTIFICATIONS_CACHE_PROVIDER_TTLS says otherwise
+    batches_apps: bool = False # `fetch_counts` can count several apps of one user in one call
+    batches_users: bool = False # `fetch_counts` can count several users of one app in one call
+
+
+class NotificationProvider(abc.ABC):
+    """
+    Base class for notification count providers, registered per AppLink.type.
+
+    Subclasses implement the abstract `request_url`, `fetch_pages` and `parse`, so an incomplete
+    provider fails when it is instantiated (i.e. registered), not on its first fetch. `fetch_count`
+    wraps them with the origin's circuit breaker and maps upstream errors to responses. All
+    methods run on the upstream pool's loop, so they must never block.
+    """
+    type: str = ''
+    title: str = ''
+    capabilities = ProviderCapabilities()
+
+    def capabilities_for(self, app_link: AppLink) -> ProviderCapabilities:
+        """Capabilities for one app; providers configured per app may differ from `capabilities`."""
+        return self.capabilities
+
+    @abc.abstractmethod
+    def request_url(self, pending: PendingFetch) -> str:
+        """The URL `fetch_count` guards with that origin's circuit breaker."""
+
+    @abc.abstractmethod
+    async def fetch_pages(self, client: httpx.AsyncClient, pending: PendingFetch, timeout: float) -> List[UpstreamPage]:
+        """Reads the upstream response(s) the count is computed from (see `read_page`)."""
+
+    @abc.abstractmethod
+    def parse(self, pending: PendingFetch, pages: List[UpstreamPage]) -> NotificationCountResponse:
+        """Computes the count from pages that passed `status_error`."""
+
+    async def read_page(self, client: httpx.AsyncClient, method: str, url: str, timeout: float, read_body: bool = True, **kwargs) -> UpstreamPage:
+        """Sends one request, reading at most UPSTREAM_MAX_BYTES of the body (or none of it)."""
+        async with client.stream(method, url, timeout=timeout, **kwargs) as response:
+            body = bytearray()
+            if read_body:
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) > UPSTREAM_MAX_BYTES:
+                        raise NotificationError(f"Response from {url} exceeds {UPSTREAM_MAX_BYTES} bytes.", error_type="response_too_large", upstream_responded=True)
+        return response, bytes(body)
+
+    def status_error(self, pending: PendingFetch, pages: List[UpstreamPage]) -> Optional[NotificationCountResponse]:
+        """Returns the error response for the first page with an error status, if any."""
+        app_id, user_identifier = pending.app_link.id, pending.user_identifier
+        for response, body in pages:
+            if response.status_code == 401:
+                logger.warning(f"Notifications: Unauthorized access to {self.title} API ({app_id}) for user {user_identifier}. Check API key.")
+                return NotificationCountResponse(count=None, error="unauthorized")
+            if response.is_error:
+                logger.error(f"Notifications: HTTP error from {self.title} ({app_id}) for user {user_identifier}: {response.status_code} - {body[:200]!r}")
+                return NotificationCountResponse(count=None, error="fetch_failed")
+        return None
+
+    def error_response(self, error: Exception, pending: PendingFetch) -> NotificationCountResponse:
+        """Maps an exception raised while fetching/parsing a response to an error response."""
+        app_id, user_identifier = pending.app_link.id, pending.user_identifier
+        if isinstance(error, httpx.TimeoutException):
+            logger.warning(f"Notifications: Timeout fetching data from {self.title} ({app_id}) for user {user_identifier}.")
+            return NotificationCountResponse(count=None, error="timeout")
+        if isinstance(error, httpx.RequestError):
+            logger.error(f"Notifications: Request error for {self.title} ({app_id}) for user {user_identifier}: {error}")
+            return NotificationCountResponse(count=None, error="fetch_failed")
+        if isinstance(error, NotificationError):
+            logger.error(f"Notifications: Error processing {self.title} response ({app_id}) for user {user_identifier}: {error}")
+            return NotificationCountResponse(count=None, error=error.error_type)
+        # Catch-all for other issues like JSON parsing
+        logger.error(f"Notifications: Unexpected error processing {self.title} response ({app_id}) for user {user_identifier}: {error}")
+        return NotificationCountResponse(count=None, error="fetch_failed")
+
+    async def fetch_count(self, pending: PendingFetch) -> NotificationCountResponse:
+        """
+        Fetches one count over the pooled client for the request's origin. Requests to an origin
+        whose circuit breaker is open fail fast with `upstream_unavailable`.
+        """
+        app_id, user_identifier = pending.app_link.id, pending.user_identifier
+        url = self.request_url(pending)
+        breaker = circuit_breakers.for_url(url)
+        if not breaker.allow_request():
+            logger.info(f"Notifications: Circuit open for {breaker.origin}; skipping {self.title} ({app_id}) for user {user_identifier}.")
+            return NotificationCountResponse(count=None, error="upstream_unavailable")
+
+        logger.info(f"Fetching {self.title} notifications from {url} for user {user_identifier}, app {app_id}")
+        try:
+            pages = await self.fetch_pages(upstream_pool.client_for(url), pending, upstream_timeout(pending.app_link))
+        except httpx.RequestError as e: # Timeouts and connection errors count against the upstream
+            breaker.record_failure()
+            return self.error_response(e, pending)
+        except NotificationError as e:
+            if e.upstream_responded: # The upstream answered, just not usefully (e.g. too much)
+                breaker.record_success()
+            else: # Raised before any request (e.g. invalid app options); says nothing about the upstream
+                breaker.release_probe()
+            return self.error_response(e, pending)
+        except BaseException:
+            breaker.release_probe() # No verdict on the upstream (e.g. cancelled); only let the next probe through
+            raise
+
+        if any(response.status_code >= 500 for response, _ in pages):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        try:
+            return self.status_error(pending, pages) or self.parse(pending, pages)
+        except Exception as e:
+            return self.error_response(e, pending)
+
+    async def fetch_counts(self, pending_fetches: List[PendingFetch]) -> List[NotificationCountResponse]:
+        """
+        Fetches several counts. Providers declaring `batches_apps` or `batches_users` override this
+        to combine them into fewer upstream calls; by default each is fetched separately.
+        """
+        return list(await asyncio.gather(*(self.fetch_count(pending) for pending in pending_fetches)))
@@ -0,0 +1,123 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin
+
+import httpx
+from pydantic import BaseModel, ValidationError, model_validator
+
+from config.schemas import AppLink
+from ..schemas import NotificationCountResponse
+from .base import (
+    NotificationError, NotificationProvider, PendingFetch, ProviderCapabilities, UpstreamPage,
+    HEAD_REQUEST, SINGLE_PAGE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class JsonPathOptions(BaseModel):
+    """
+    The `notifications` block of an app with `type: json` in config.yml, e.g. for Gitea:
+
+        notifications:
+          path: /api/v1/notifications/new
+          count: new
+          auth_scheme: token
+    """
+    path: str = '' # Appended to the app's URL; may also be an absolute URL
+    count: Optional[str] = None # Dotted path to the count, or to a list whose items are counted ('' is the whole document)
+    unread_field: Optional[str] = None # When `count` is a list: only count items whose field is null or false
+    count_header: Optional[str] = None # Read the count from this response header of a HEAD request instead
+    auth_header: str = 'Authorization'
+    auth_scheme: str = 'Bearer' # Prefix of the API key in `auth_header`; '' sends the bare key
+    params: Dict[str, Any] = {} # Extra query parameters
+
+    @model_validator(mode='after')
+    def _check_count_source(self):
+        if self.count is None and not self.count_header:
+            raise ValueError("either 'count' or 'count_header' is required")
+        return self
+
+
+def resolve_path(document: Any, path: str) -> Any:
+    """Follows a dotted path ('data.items', 'results.0.total') into decoded JSON."""
+    value = document
+    for segment in filter(None, path.split('.')):
+        if isinstance(value, list) and segment.isdigit():
+            value = value[int(segment)]
+        elif isinstance(value, dict):
+            value = value[segment]
+        else:
+            raise KeyError(segment)
+    return value
+
+
+class JsonPathProvider(NotificationProvider):
+    """
+    Generic provider for any JSON API that exposes an unread count (or a list of unread items),
+    configured per app in config.yml instead of in code.
+    """
+    type = 'json'
+    title = 'JSON'
+    capabilities = ProviderCapabilities(count_strategy=SINGLE_PAGE, default_ttl=60.0)
+
+    def options(self, app_link: AppLink) -> JsonPathOptions:
+        try:
+            return JsonPathOptions.model_validate((app_link.model_extra or {}).get('notifications') or {})
+        except ValidationError as e:
+            raise NotificationError(f"Invalid 'notifications' options for app {app_link.id}: {e}", error_type="config_invalid")
+
+    def capabilities_for(self, app_link: AppLink) -> ProviderCapabilities:
+        try:
+            options = self.options(app_link)
+        except NotificationError:
+            return self.capabilities
+        if options.count_header:
+            return ProviderCapabilities(count_strategy=HEAD_REQUEST, default_ttl=self.capabilities.default_ttl)
+        return self.capabilities
+
+    def request_url(self, pending: PendingFetch) -> str:
+        try:
+            path = self.options(pending.app_link).path
+        except NotificationError:
+            path = ''
+        return urljoin(pending.app_link.url.rstrip('/') + '/', path.lstrip('/')) if path else pending.app_link.url
+
+    async def fetch_pages(self, client: httpx.AsyncClient, pending: PendingFetch, timeout: float) -> List[UpstreamPage]:
+        options = self.options(pending.app_link)
+        headers = {
+            "Accept": "application/json",
+            options.auth_header: f"{options.auth_scheme} {pending.api_key}" if options.auth_scheme else pending.api_key,
+        }
+        method = 'HEAD' if options.count_header else 'GET'
+        page = await self.read_page(
+            client, method, self.request_url(pending), timeout,
+            read_body=not options.count_header, headers=headers, params=options.params,
+        )
+        return [page]
+
+    def parse(self, pending: PendingFetch, pages: List[UpstreamPage]) -> NotificationCountResponse:
+        app_id, user_identifier = pending.app_link.id, pending.user_identifier
+        options = self.options(pending.app_link)
+        response, body = pages[0]
+        try:
+            if options.count_header:
+                value = int(response.headers[options.count_header])
+            else:
+                value = resolve_path(json.loads(body), options.count)
+        except (KeyError, IndexError, ValueError) as e:
+            logger.warning(f"Notifications: Count not found in JSON response ({app_id}) for user {user_identifier}: {e!r}")
+            return NotificationCountResponse(count=None, error="fetch_failed")
+
+        if isinstance(value, list):
+            field = options.unread_field
+            count = sum(1 for item in value if not field or (isinstance(item, dict) and not item.get(field)))
+        elif isinstance(value, int) and not isinstance(value, bool):
+            count = value
+        else:
+            logger.warning(f"Notifications: Unexpected count {value!r} in JSON response ({app_id}) for user {user_identifier}.")
+            return NotificationCountResponse(count=None, error="fetch_failed")
+
+        logger.info(f"JSON notifications count for {app_id} / {user_identifier}: {count}")
+        return NotificationCountResponse(count=count)
@@ -0,0 +1,74 @@
+import json
+import asyncio
+import logging
+from typing import List
+
+import httpx
+from django.conf import settings
+
+from ..schemas import NotificationCountResponse
+from .base import NotificationProvider, PendingFetch, ProviderCapabilities, UpstreamPage, PAGINATED
+
+logger = logging.getLogger(__name__)
+
+# Vikunja paginates notifications; pages beyond VIKUNJA_MAX_PAGES are not counted
+VIKUNJA_PER_PAGE = getattr(settings, 'NOTIFICATIONS_VIKUNJA_PER_PAGE', 50)
+VIKUNJA_MAX_PAGES = getattr(settings, 'NOTIFICATIONS_VIKUNJA_MAX_PAGES', 20)
+VIKUNJA_UNREAD_MARKERS = (None, "0001-01-01T00:00:00Z") # Values of `read_at` meaning "not read yet"
+
+
+class VikunjaProvider(NotificationProvider):
+    """
+    Counts unread Vikunja notifications. The first page's pagination headers tell how many
+    more pages there are; those (up to VIKUNJA_MAX_PAGES) are then fetched concurrently.
+    """
+    type = 'vikunja'
+    title = 'Vikunja'
+    capabilities = ProviderCapabilities(count_strategy=PAGINATED, default_ttl=30.0)
+
+    def request_url(self, pending: PendingFetch) -> str:
+        return f"{pending.app_link.url.rstrip('/')}/api/v1/notifications"
+
+    def _headers(self, pending: PendingFetch) -> dict:
+        return {
+            "Authorization": f"Bearer {pending.api_key}",
+            "Accept": "application/json",
+        }
+
+    def _total_pages(self, response: httpx.Response) -> int:
+        try:
+            return max(1, int(response.headers.get('x-pagination-total-pages', 1)))
+        except ValueError:
+            return 1
+
+    async def fetch_pages(self, client: httpx.AsyncClient, pending: PendingFetch, timeout: float) -> List[UpstreamPage]:
+        url, headers = self.request_url(pending), self._headers(pending)
+
+        def get_page(page: int):
+            return self.read_page(client, 'GET', url, timeout, headers=headers, params={'page': page, 'per_page': VIKUNJA_PER_PAGE})
+
+        pages = [await get_page(1)]
+        total_pages = self._total_pages(pages[0][0]) if pages[0][0].status_code == 200 else 1
+        if total_pages > VIKUNJA_MAX_PAGES:
+            logger.warning(f"Notifications: Vikunja ({pending.app_link.id}) has {total_pages} pages of notifications for user {pending.user_identifier}; counting the first {VIKUNJA_MAX_PAGES}.")
+        if total_pages > 1:
+            pages += await asyncio.gather(*(get_page(page) for page in range(2, min(total_pages, VIKUNJA_MAX_PAGES) + 1)))
+        return pages
+
+    def parse(self, pending: PendingFetch, pages: List[UpstreamPage]) -> NotificationCountResponse:
+        """Counts unread notifications over all fetched pages, checking only each item's `read_at`."""
+        app_id, user_identifier = pending.app_link.id, pending.user_identifier
+        unread_count = 0
+        for _, body in pages:
+            notifications_data = json.loads(body)
+            if not isinstance(notifications_data, list):
+                logger.warning(f"Notifications: Unexpected response format from Vikunja ({app_id}) for user {user_identifier}. Expected list.")
+                return NotificationCountResponse(count=None, error="fetch_failed")
+
+            for item in notifications_data:
+                # Vikunja marks unread notifications with a null or zero read_at
+                if isinstance(item, dict) and item.get('read_at') in VIKUNJA_UNREAD_MARKERS:
+                    unread_count += 1
+
+        logger.info(f"Vikunja notifications count for {app_id} / {user_identifier}: {unread_count}")
+        return NotificationCountResponse(count=unread_count)
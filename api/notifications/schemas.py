@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from pydantic import BaseModel
 
 class NotificationCountResponse(BaseModel):
@@ -7,6 +7,13 @@ class NotificationCountResponse(BaseModel):
     """
     count: Optional[int] = None
     error: Optional[str] = None # To indicate issues like 'unauthorized', 'timeout', 'fetch_failed'
+    cache: Optional[str] = None # 'hit', 'stale' (served while refreshing in the background), 'store' (from the poller) or 'miss'
+
+class BatchNotificationCountResponse(BaseModel):
+    """
+    Response schema for the batch notification count endpoint, keyed by app_id.
+    """
+    results: Dict[str, NotificationCountResponse]
 
 # Example schema for an external notification item, if needed for more complex parsing.
 # For Vikunja, it was checking for a 'read_at' property.
@@ -1,140 +1,369 @@
+import asyncio
 import logging
-import httpx
-from typing import List, Optional, Dict
+from datetime import timedelta
+from typing import Hashable, Iterable, List, Optional, Dict, Tuple
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
 
-from config.services import ConfigService as AppConfigService, ConfigError as AppConfigError
+from config.services import ConfigError as AppConfigError, ConfigSnapshot, get_config_service
 from config.schemas import AppLink # To get app_url and app_type
+from config.permissions import RolePermissions
 # Removed UserSettingsService and UserSettingsError
-from users.models import UserApplicationSetting # Import the new Django model
+from users.services import UserSettings, user_settings_store
+from .models import NotificationCountRecord
 # Removed AppSpecificSetting from users.schemas
-from .schemas import NotificationCountResponse, ExternalNotificationItem # For response and parsing external data
+from .schemas import NotificationCountResponse # For response and parsing external data
+from .clients import upstream_pool
+from .singleflight import upstream_flights
+from .providers import PendingFetch, provider_registry
+from .cache import NotificationCountCache, notification_count_cache, ttl_for, CACHE_ENABLED, CACHE_MISS, CACHE_STORE
 
 logger = logging.getLogger(__name__)
 
-class NotificationError(Exception):
-    """Custom exception for notification fetching errors."""
-    def __init__(self, message, error_type: Optional[str] = "fetch_failed", status_code=500):
-        super().__init__(message)
-        self.error_type = error_type # e.g., 'unauthorized', 'timeout', 'config_missing'
-        self.status_code = status_code
+# Maximum number of upstream requests a batch fetch runs at the same time
+BATCH_CONCURRENCY = getattr(settings, 'NOTIFICATIONS_BATCH_CONCURRENCY', 8)
+# Whether the background poller runs; without it there is nothing in NotificationCountRecord worth a query
+POLLER_ENABLED = getattr(settings, 'NOTIFICATIONS_POLLER', False)
+# Seconds a count written by the background poller (NotificationCountRecord) is served without asking upstream.
+# Should exceed the poll interval; 0 disables reading the poller's store.
+STORE_MAX_AGE = getattr(settings, 'NOTIFICATIONS_STORE_MAX_AGE', 150.0)
+
+# Final results of _prepare_fetch that needed a database lookup and are therefore worth caching
+CACHEABLE_PREPARE_ERRORS = frozenset({'config_missing_apikey'})
 
 
 class NotificationService:
-    def __init__(self):
-        self.app_config_service = AppConfigService()
+    def __init__(self, cache: NotificationCountCache | None = notification_count_cache if CACHE_ENABLED else None):
+        self.app_config_service = get_config_service()
+        self.cache = cache
         # Removed self.user_settings_service initialization
 
-    def _find_app_link(self, app_id: str) -> Optional[AppLink]:
-        """Finds an AppLink by its ID from the main configuration."""
+    def _config_snapshot(self) -> Optional[ConfigSnapshot]:
+        """The current config snapshot, or None if the main config can't be loaded."""
         try:
-            config = self.app_config_service.load_config()
-            for nav_item_wrapper in config.navigationItems:
-                item = nav_item_wrapper.root
-                if isinstance(item, AppLink) and item.id == app_id:
-                    return item
-                elif hasattr(item, 'apps'): # NavCategory
-                    for app in item.apps:
-                        if app.id == app_id:
-                            return app
+            return self.app_config_service.get_snapshot()
+        except AppConfigError as e:
+            logger.error(f"Notifications: Could not load main config: {e}")
             return None
-        except AppConfigError:
-            logger.error(f"Notifications: Could not load main config to find app {app_id}.")
+
+    async def _aconfig_snapshot(self) -> Optional[ConfigSnapshot]:
+        """_config_snapshot for async code; a due reload check runs off the event loop."""
+        try:
+            return await self.app_config_service.aget_snapshot()
+        except AppConfigError as e:
+            logger.error(f"Notifications: Could not load main config: {e}")
             return None
 
-    def _get_user_app_api_key(self, user_identifier: str, app_id: str) -> Optional[str]:
-        """Gets the API key for a specific app for a user from the database."""
+    def _find_app_link(self, app_id: str, snapshot: Optional[ConfigSnapshot]) -> Optional[AppLink]:
+        """Finds an AppLink by its ID in a config snapshot (None: the config could not be loaded)."""
+        return snapshot.index.get_app(app_id) if snapshot is not None else None
+
+    def _get_user_app_api_key(self, user_identifier: str, app_id: str, user_settings: Optional[UserSettings] = None) -> Optional[str]:
+        """
+        Gets the API key for a specific app for a user from the database. Pass the user's
+        already loaded `user_settings` to avoid another lookup when preparing many apps.
+        """
         try:
-            user_app_setting = UserApplicationSetting.objects.get(
-                user_identifier=user_identifier,
-                app_id=app_id
-            )
-            # The 'settings' field is a JSONField, expected to be a dict.
-            # The api_key was previously stored directly under the app_id.
-            # e.g. users.yml: default: { app-vikunja: { api_key: "..." } }
+            # All of the user's rows are loaded (and decrypted) together, see users.services.
             # New model: UserApplicationSetting.settings = { "api_key": "..." }
-            if user_app_setting.settings and 'api_key' in user_app_setting.settings:
-                return user_app_setting.settings['api_key']
-            return None
-        except UserApplicationSetting.DoesNotExist:
-            logger.info(f"Notifications: No specific settings found for user {user_identifier}, app {app_id}.")
-            return None
+            if user_settings is None:
+                user_settings = user_settings_store.for_user(user_identifier)
+            api_key = user_settings.api_key(app_id)
+            if api_key is None and app_id not in user_settings.app_ids():
+                logger.info(f"Notifications: No specific settings found for user {user_identifier}, app {app_id}.")
+            return api_key
         except Exception as e: # Catch other potential errors, e.g., DB connection
             logger.error(f"Notifications: Error fetching user app settings for user {user_identifier}, app {app_id}: {e}")
             return None
 
-    def _fetch_vikunja_notifications(self, app_url: str, api_key: str, user_identifier: str, app_id: str) -> NotificationCountResponse:
-        base_url = app_url.rstrip('/')
-        api_url = f"{base_url}/api/v1/notifications"
-        
-        logger.info(f"Fetching Vikunja notifications from {api_url} for user {user_identifier}, app {app_id}")
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Accept": "application/json",
-        }
-        try:
-            with httpx.Client(timeout=5.0) as client:
-                response = client.get(api_url, headers=headers)
-            print(response.status_code, response.text) # Debugging line to check response status and text
-            if response.status_code == 401:
-                logger.warning(f"Notifications: Unauthorized access to Vikunja API ({app_id}) for user {user_identifier}. Check API key.")
-                return NotificationCountResponse(count=None, error="unauthorized")
-            
-            response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
-            
-            notifications_data = response.json()
-            if not isinstance(notifications_data, list):
-                logger.warning(f"Notifications: Unexpected response format from Vikunja ({app_id}) for user {user_identifier}. Expected list.")
-                return NotificationCountResponse(count=None, error="fetch_failed")
-
-            # Parse with Pydantic model for safety, though only 'read_at' is used
-            unread_count = 0
-            for raw_item in notifications_data:
-                try:
-                    item = ExternalNotificationItem.model_validate(raw_item)
-                    if item.read_at is None or item.read_at == "0001-01-01T00:00:00Z":
-                        unread_count += 1
-                except Exception: # Pydantic ValidationError or other
-                    logger.warning(f"Skipping invalid notification item from Vikunja: {raw_item}")
-            
-            logger.info(f"Vikunja notifications count for {app_id} / {user_identifier}: {unread_count}")
-            return NotificationCountResponse(count=unread_count)
-
-        except httpx.TimeoutException:
-            logger.warning(f"Notifications: Timeout fetching data from Vikunja ({app_id}) for user {user_identifier}.")
-            return NotificationCountResponse(count=None, error="timeout")
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Notifications: HTTP error from Vikunja ({app_id}) for user {user_identifier}: {e.response.status_code} - {e.response.text}")
-            return NotificationCountResponse(count=None, error="fetch_failed")
-        except httpx.RequestError as e:
-            logger.error(f"Notifications: Request error for Vikunja ({app_id}) for user {user_identifier}: {e}")
-            return NotificationCountResponse(count=None, error="fetch_failed")
-        except Exception as e: # Catch-all for other issues like JSON parsing
-            logger.error(f"Notifications: Unexpected error processing Vikunja response ({app_id}) for user {user_identifier}: {e}")
-            return NotificationCountResponse(count=None, error="fetch_failed")
+    async def _fetch_count(self, pending: PendingFetch) -> NotificationCountResponse:
+        """
+        Fetches one count through the provider registered for the app's type. Runs on the upstream pool's loop.
+        Concurrent fetches of the same app with the same API key (several tabs, or users sharing a key)
+        share a single upstream request.
+        """
+        provider = provider_registry.get(pending.app_link.type)
+        key = (provider.type, pending.app_link.id, pending.api_key)
+        return await upstream_flights.do(key, lambda: provider.fetch_count(pending))
 
+    def _load_user_settings(self, user_identifier: str) -> Optional[UserSettings]:
+        """Loads all of a user's app settings at once; None if that fails (lookups then retry per app)."""
+        try:
+            return user_settings_store.for_user(user_identifier)
+        except Exception as e:
+            logger.error(f"Notifications: Error loading app settings for user {user_identifier}: {e}")
+            return None
 
-    def get_notification_count(self, user_identifier: str, app_id: str) -> NotificationCountResponse:
-        app_link = self._find_app_link(app_id)
+    def _prepare_fetch(self, user_identifier: str, app_id: str, snapshot: Optional[ConfigSnapshot], user_settings: Optional[UserSettings] = None) -> NotificationCountResponse | PendingFetch:
+        """
+        Resolves the app in `snapshot` and the user's API key (database access only).
+        Returns either a final response, when there is nothing to fetch, or a PendingFetch.
+        """
+        app_link = self._find_app_link(app_id, snapshot)
         if not app_link:
             logger.warning(f"Notifications: AppLink with ID '{app_id}' not found in configuration.")
             # Nuxt returned { count: null } for unknown apps, which is fine.
             return NotificationCountResponse(count=None, error="app_not_found") 
         
         if not app_link.type:
-            logger.info(f"Notifications: App '{app_id}' (type: {app_link.name}) does not support notifications (no type defined).")
+            logger.info(f"Notifications: App '{app_id}' (title: {app_link.title}) does not support notifications (no type defined).")
             return NotificationCountResponse(count=None) # No error, just no count
 
-        api_key = self._get_user_app_api_key(user_identifier, app_id)
+        if provider_registry.get(app_link.type) is None:
+            # Providers are registered in notifications.providers (or via NOTIFICATIONS_PROVIDERS)
+            logger.info(f"Notifications: Unsupported type \"{app_link.type}\" for app {app_id}")
+            return NotificationCountResponse(count=None) # Type defined but not handled
+
+        api_key = self._get_user_app_api_key(user_identifier, app_id, user_settings)
         if not api_key:
             logger.warning(f"Notifications: Missing api_key for {app_link.type} ({app_id}) for user {user_identifier}. Cannot fetch.")
             # Nuxt returned { count: null } if API key missing, not an error to the client.
             return NotificationCountResponse(count=None, error="config_missing_apikey")
 
-        if app_link.type == 'vikunja':
-            return self._fetch_vikunja_notifications(app_link.url, api_key, user_identifier, app_id)
-        # Add other app types here
-        # elif app_link.type == 'another-service':
-        #     pass
+        return PendingFetch(user_identifier=user_identifier, app_link=app_link, api_key=api_key)
+
+    def get_notification_count(self, user_identifier: str, app_id: str) -> NotificationCountResponse:
+        return self.get_notification_counts(user_identifier, [app_id])[app_id]
+
+    def _store(self, user_identifier: str, app_id: str, app_type: Optional[str], response: NotificationCountResponse):
+        """Caches a freshly computed result if it is worth caching; otherwise drops any stale entry."""
+        if self.cache is None:
+            return
+        key = (user_identifier, app_id)
+        if app_type is not None or response.error in CACHEABLE_PREPARE_ERRORS:
+            self.cache.set(key, response, ttl_for(app_type, response))
         else:
-            logger.info(f"Notifications: Unsupported type \"{app_link.type}\" for app {app_id}")
-            return NotificationCountResponse(count=None) # Type defined but not handled
+            self.cache.invalidate(user_identifier, app_id)
+
+    def _prepare_fetch_in_thread(self, user_identifier: str, app_id: str) -> NotificationCountResponse | PendingFetch:
+        """_prepare_fetch for use off the request thread; releases the thread's database connection afterwards."""
+        try:
+            return self._prepare_fetch(user_identifier, app_id, self._config_snapshot())
+        finally:
+            close_old_connections()
+
+    async def _refresh(self, user_identifier: str, app_id: str):
+        """Recomputes a stale cache entry. Runs on the upstream pool's loop."""
+        try:
+            pending = await asyncio.to_thread(self._prepare_fetch_in_thread, user_identifier, app_id)
+            if isinstance(pending, PendingFetch):
+                self._store(user_identifier, app_id, pending.app_link.type, await self._fetch_count(pending))
+            else:
+                self._store(user_identifier, app_id, None, pending)
+        except Exception as e:
+            logger.error(f"Notifications: Background refresh failed for user {user_identifier}, app {app_id}: {e}")
+            self.cache.release((user_identifier, app_id))
+
+    def _polled_records(self, user_identifier: str, app_ids: List[str]):
+        """Query for counts the background poller stored recently enough for the given apps."""
+        return NotificationCountRecord.objects.filter(
+            user_identifier=user_identifier,
+            app_id__in=app_ids,
+            fetched_at__gte=timezone.now() - timedelta(seconds=STORE_MAX_AGE),
+        )
+
+    def _use_polled_records(self, user_identifier: str, records: Iterable[NotificationCountRecord], snapshot: Optional[ConfigSnapshot]) -> Dict[str, NotificationCountResponse]:
+        """Caches polled counts in memory and returns them marked as coming from the store."""
+        polled = {
+            record.app_id: NotificationCountResponse(count=record.count, error=record.error)
+            for record in records
+        }
+        for app_id, response in polled.items():
+            app_link = self._find_app_link(app_id, snapshot)
+            self._store(user_identifier, app_id, app_link.type if app_link else None, response)
+        return {app_id: response.model_copy(update={'cache': CACHE_STORE}) for app_id, response in polled.items()}
+
+    def _read_polled_counts(self, user_identifier: str, app_ids: List[str], snapshot: Optional[ConfigSnapshot]) -> Dict[str, NotificationCountResponse]:
+        """Returns counts the background poller stored recently enough for the given apps, caching them in memory."""
+        if not app_ids or not POLLER_ENABLED or not STORE_MAX_AGE:
+            return {}
+        try:
+            records = list(self._polled_records(user_identifier, app_ids))
+        except Exception as e: # The store is an optimization; fall back to asking upstream
+            logger.error(f"Notifications: Could not read polled counts for user {user_identifier}: {e}")
+            return {}
+        return self._use_polled_records(user_identifier, records, snapshot)
+
+    async def _aread_polled_counts(self, user_identifier: str, app_ids: List[str], snapshot: Optional[ConfigSnapshot]) -> Dict[str, NotificationCountResponse]:
+        """_read_polled_counts over the async ORM."""
+        if not app_ids or not POLLER_ENABLED or not STORE_MAX_AGE:
+            return {}
+        try:
+            records = [record async for record in self._polled_records(user_identifier, app_ids)]
+        except Exception as e: # The store is an optimization; fall back to asking upstream
+            logger.error(f"Notifications: Could not read polled counts for user {user_identifier}: {e}")
+            return {}
+        return self._use_polled_records(user_identifier, records, snapshot)
+
+    def visible_notification_app_ids(self, user_identifier: str, permissions: Optional[RolePermissions] = None) -> List[str]:
+        """
+        Returns the ids of all apps the user's role can see that have a notification type, in config order.
+        `permissions` (e.g. from the request's Principal) saves resolving the user's role again.
+        """
+        return self._visible_app_ids(self._config_snapshot(), user_identifier, permissions)
+
+    async def avisible_notification_app_ids(self, user_identifier: str, permissions: Optional[RolePermissions] = None) -> List[str]:
+        """visible_notification_app_ids for async views."""
+        return self._visible_app_ids(await self._aconfig_snapshot(), user_identifier, permissions)
+
+    def _visible_app_ids(self, snapshot: Optional[ConfigSnapshot], user_identifier: str, permissions: Optional[RolePermissions]) -> List[str]:
+        if snapshot is None:
+            return []
+        if permissions is None:
+            permissions = snapshot.role_permissions.get(snapshot.resolve_role(user_identifier))
+        if not permissions:
+            return []
+        return [
+            app_id for app_id, app_link in snapshot.index.apps_by_id.items()
+            if app_link.type and permissions.can_access(app_id)
+        ]
+
+    async def _fetch_many(self, pending_fetches: Dict[Hashable, PendingFetch], max_concurrency: int) -> Dict[Hashable, NotificationCountResponse]:
+        """
+        Fetches counts concurrently, with at most `max_concurrency` requests in flight, keeping
+        the keys of `pending_fetches`. Apps whose provider can batch are handed to it in one
+        `fetch_counts` call per provider. Runs on the upstream pool's loop.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        singles: List[Hashable] = []
+        batches: Dict[str, List[Hashable]] = {}
+        for key, pending in pending_fetches.items():
+            provider = provider_registry.get(pending.app_link.type)
+            capabilities = provider.capabilities_for(pending.app_link)
+            if capabilities.batches_apps or capabilities.batches_users:
+                batches.setdefault(provider.type, []).append(key)
+            else:
+                singles.append(key)
+
+        async def fetch_one(key: Hashable) -> Dict[Hashable, NotificationCountResponse]:
+            async with semaphore:
+                return {key: await self._fetch_count(pending_fetches[key])}
+
+        async def fetch_batch(app_type: str, keys: List[Hashable]) -> Dict[Hashable, NotificationCountResponse]:
+            async with semaphore:
+                responses = await provider_registry.get(app_type).fetch_counts([pending_fetches[key] for key in keys])
+            return dict(zip(keys, responses))
+
+        results: Dict[Hashable, NotificationCountResponse] = {}
+        for partial in await asyncio.gather(
+            *(fetch_one(key) for key in singles),
+            *(fetch_batch(app_type, keys) for app_type, keys in batches.items()),
+        ):
+            results.update(partial)
+        return {key: results[key] for key in pending_fetches}
+
+    def fetch_counts_for_pairs(self, pairs: Iterable[Tuple[str, str]], max_concurrency: int = BATCH_CONCURRENCY) -> Dict[Tuple[str, str], NotificationCountResponse]:
+        """
+        Fetches fresh counts for many (user_identifier, app_id) pairs in one concurrent fan-out,
+        bypassing the cache. Used by the background poller.
+        """
+        results: Dict[Tuple[str, str], NotificationCountResponse] = {}
+        pending_fetches: Dict[Tuple[str, str], PendingFetch] = {}
+        user_settings: Dict[str, Optional[UserSettings]] = {}
+        snapshot = self._config_snapshot()
+        for user_identifier, app_id in dict.fromkeys(pairs):
+            if user_identifier not in user_settings:
+                user_settings[user_identifier] = self._load_user_settings(user_identifier)
+            pending = self._prepare_fetch(user_identifier, app_id, snapshot, user_settings[user_identifier])
+            if isinstance(pending, NotificationCountResponse):
+                results[(user_identifier, app_id)] = pending
+            else:
+                pending_fetches[(user_identifier, app_id)] = pending
+        if pending_fetches:
+            results.update(upstream_pool.run(self._fetch_many(pending_fetches, max_concurrency)))
+        return results
+
+    async def get_notification_counts_async(self, pending_fetches: Dict[str, PendingFetch], max_concurrency: int = BATCH_CONCURRENCY) -> Dict[str, NotificationCountResponse]:
+        """Fetches counts for already prepared apps concurrently, awaitable from any event loop."""
+        return await upstream_pool.run_async(self._fetch_many(pending_fetches, max_concurrency))
+
+    def _cached_counts(self, user_identifier: str, app_ids: List[str]) -> Dict[str, Optional[NotificationCountResponse]]:
+        """
+        Looks the apps up in the in-memory cache, scheduling background refreshes of stale entries.
+        Returns a dict in request order with None for every app still to be resolved.
+        """
+        results: Dict[str, Optional[NotificationCountResponse]] = {}
+        for app_id in app_ids:
+            if self.cache is not None:
+                cached, state, should_refresh = self.cache.get((user_identifier, app_id))
+                if cached is not None:
+                    results[app_id] = cached.model_copy(update={'cache': state})
+                    if should_refresh:
+                        upstream_pool.submit(self._refresh(user_identifier, app_id))
+                    continue
+
+            results[app_id] = None # Placeholder keeping the request order; filled below
+        return results
+
+    def _prepare_missing(self, user_identifier: str, app_ids: List[str], snapshot: Optional[ConfigSnapshot], user_settings: Optional[UserSettings], results: Dict[str, Optional[NotificationCountResponse]]) -> Dict[str, PendingFetch]:
+        """Prepares the given apps, filling `results` with final responses and returning the fetches still needed."""
+        pending_fetches: Dict[str, PendingFetch] = {}
+        for app_id in app_ids:
+            pending = self._prepare_fetch(user_identifier, app_id, snapshot, user_settings)
+            if isinstance(pending, NotificationCountResponse):
+                self._store(user_identifier, app_id, None, pending)
+                results[app_id] = pending
+            else:
+                pending_fetches[app_id] = pending
+        return pending_fetches
+
+    def _finish(self, user_identifier: str, app_ids: List[str], results: Dict[str, NotificationCountResponse], pending_fetches: Dict[str, PendingFetch], fetched: Dict[str, NotificationCountResponse]) -> Dict[str, NotificationCountResponse]:
+        """Caches fetched counts and returns all results in request order, marking uncached ones as misses."""
+        for app_id, response in fetched.items():
+            self._store(user_identifier, app_id, pending_fetches[app_id].app_link.type, response)
+        results.update(fetched)
+        return {
+            app_id: results[app_id] if results[app_id].cache else results[app_id].model_copy(update={'cache': CACHE_MISS})
+            for app_id in app_ids
+        }
+
+    def get_notification_counts(self, user_identifier: str, app_ids: Iterable[str]) -> Dict[str, NotificationCountResponse]:
+        """
+        Returns a count per requested app. Fresh cached counts are returned as is; stale ones are
+        returned immediately and refreshed in the background. Next come recent counts written by the
+        background poller (one query for all apps). For the rest, config and API key
+        lookups run first, then all upstream requests are issued concurrently over the shared
+        connection pool, so the total latency is that of the slowest upstream.
+        Each response's `cache` field reports whether it was a cache hit, stale, from the poller's store or a miss.
+        """
+        app_ids = list(dict.fromkeys(app_ids)) # De-duplicate, keeping order
+        results = self._cached_counts(user_identifier, app_ids)
+
+        missing = [app_id for app_id, response in results.items() if response is None]
+        snapshot = self._config_snapshot() if missing else None
+        results.update(self._read_polled_counts(user_identifier, missing, snapshot))
+
+        to_prepare = [app_id for app_id in missing if results[app_id] is None]
+        user_settings = self._load_user_settings(user_identifier) if to_prepare else None # One query for all apps
+        pending_fetches = self._prepare_missing(user_identifier, to_prepare, snapshot, user_settings, results)
+
+        fetched = upstream_pool.run(self._fetch_many(pending_fetches, BATCH_CONCURRENCY)) if pending_fetches else {}
+        return self._finish(user_identifier, app_ids, results, pending_fetches, fetched)
+
+    async def aget_notification_counts(self, user_identifier: str, app_ids: Iterable[str]) -> Dict[str, NotificationCountResponse]:
+        """
+        Native async get_notification_counts, for async views: database reads use the async ORM
+        and upstream fetches are awaited on the upstream pool, so no thread is held while waiting.
+        """
+        app_ids = list(dict.fromkeys(app_ids)) # De-duplicate, keeping order
+        results = self._cached_counts(user_identifier, app_ids)
+
+        missing = [app_id for app_id, response in results.items() if response is None]
+        snapshot = await self._aconfig_snapshot() if missing else None # Never reloads the config on the event loop
+        results.update(await self._aread_polled_counts(user_identifier, missing, snapshot))
+
+        to_prepare = [app_id for app_id in missing if results[app_id] is None]
+        if to_prepare:
+            try:
+                user_settings = await user_settings_store.afor_user(user_identifier) # One query for all apps
+            except Exception as e:
+                logger.error(f"Notifications: Error loading app settings for user {user_identifier}: {e}")
+                results.update({app_id: NotificationCountResponse(count=None, error="fetch_failed") for app_id in to_prepare})
+                to_prepare, user_settings = [], None
+        else:
+            user_settings = None
+        pending_fetches = self._prepare_missing(user_identifier, to_prepare, snapshot, user_settings, results)
+
+        fetched = await upstream_pool.run_async(self._fetch_many(pending_fetches, BATCH_CONCURRENCY)) if pending_fetches else {}
+        return self._finish(user_identifier, app_ids, results, pending_fetches, fetched)
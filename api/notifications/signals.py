@@ -0,0 +1,26 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from users.models import UserApplicationSetting
+from users.services import settings_bulk_updated
+from .cache import notification_count_cache
+from .models import NotificationCountRecord
+
+
+@receiver(post_save, sender=UserApplicationSetting)
+@receiver(post_delete, sender=UserApplicationSetting)
+def invalidate_cached_count(sender, instance: UserApplicationSetting, **kwargs):
+    """
+    A changed or removed API key makes the cached count (or cached error) for that app obsolete,
+    both in memory and in the background poller's store.
+    """
+    notification_count_cache.invalidate(instance.user_identifier, instance.app_id)
+    NotificationCountRecord.objects.filter(user_identifier=instance.user_identifier, app_id=instance.app_id).delete()
+
+
+@receiver(settings_bulk_updated)
+def invalidate_cached_counts(sender, user_identifier: str, app_ids, **kwargs):
+    """Same as above for settings written in bulk."""
+    for app_id in app_ids:
+        notification_count_cache.invalidate(user_identifier, app_id)
+    NotificationCountRecord.objects.filter(user_identifier=user_identifier, app_id__in=list(app_ids)).delete()
@@ -0,0 +1,42 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key onto one in-flight coroutine, whose result
+    every caller shares (single-flight).
+
+    Not thread-safe by itself: it must only be used from one event loop. Notification fetches
+    all run on the upstream pool's loop, whichever thread or loop submitted them, so a single
+    instance coalesces sync (WSGI thread) and async callers alike.
+    """
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        # Shielded, so one caller giving up (e.g. a closed stream) doesn't cancel the others' fetch
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {'in_flight': len(self._in_flight), 'started': self.started, 'coalesced': self.coalesced}
+
+
+# Process-wide, shared by every NotificationService; used only on the upstream pool's loop
+upstream_flights = SingleFlight()
@@ -0,0 +1,108 @@
+import json
+import time
+import asyncio
+import itertools
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .schemas import NotificationCountResponse
+from .services import NotificationService
+
+STREAM_INTERVAL = getattr(settings, 'NOTIFICATIONS_STREAM_INTERVAL', 5.0) # Seconds between change checks
+STREAM_HEARTBEAT = getattr(settings, 'NOTIFICATIONS_STREAM_HEARTBEAT', 15.0) # Seconds between keep-alive comments
+STREAM_MAX_DURATION = getattr(settings, 'NOTIFICATIONS_STREAM_MAX_DURATION', 3600.0) # Seconds before the client is asked to reconnect
+STREAM_RESUME_STATES = getattr(settings, 'NOTIFICATIONS_STREAM_RESUME_STATES', 5000) # Event ids remembered for Last-Event-ID
+STREAM_RETRY_MS = 3000 # Reconnection delay suggested to EventSource clients
+
+CountState = Dict[str, Tuple[Optional[int], Optional[str]]] # app_id -> (count, error) as last sent
+
+
+class StreamResumeStates:
+    """
+    Remembers, per event id, the counts a client had received when it saw that id, so a
+    reconnecting EventSource (Last-Event-ID) only receives the counts that changed since.
+    Each stream only keeps its latest id; ids of closed streams are evicted LRU-first.
+    Event ids embed a per-process epoch, so ids from another worker are simply unknown.
+    """
+    def __init__(self, max_entries: int = STREAM_RESUME_STATES):
+        self.max_entries = max_entries
+        self.epoch = f"{int(time.time() * 1000):x}"
+        self._sequence = itertools.count(1)
+        self._states: 'OrderedDict[str, Tuple[str, CountState]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def next_id(self) -> str:
+        return f"{self.epoch}-{next(self._sequence)}"
+
+    def remember(self, event_id: str, user_identifier: str, state: CountState, previous_id: Optional[str] = None):
+        with self._lock:
+            if previous_id is not None:
+                self._states.pop(previous_id, None)
+            self._states[event_id] = (user_identifier, dict(state))
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+
+    def recall(self, event_id: Optional[str], user_identifier: str) -> Optional[CountState]:
+        """Returns the state behind an event id, if it is known and belongs to the same user."""
+        if not event_id:
+            return None
+        with self._lock:
+            entry = self._states.get(event_id)
+        if entry is None or entry[0] != user_identifier:
+            return None
+        return dict(entry[1])
+
+
+stream_resume_states = StreamResumeStates()
+
+
+def _format_event(event_id: str, app_id: str, response: NotificationCountResponse) -> str:
+    # Splices the app id into the model's own JSON, so the counts are serialized without an intermediate dict
+    data = f'{{"app_id":{json.dumps(app_id)},{response.model_dump_json()[1:]}'
+    return f"id: {event_id}\nevent: count\ndata: {data}\n\n"
+
+
+async def notification_event_stream(
+    service: NotificationService,
+    user_identifier: str,
+    app_ids: List[str],
+    last_event_id: Optional[str] = None,
+    interval: float = STREAM_INTERVAL,
+    heartbeat: float = STREAM_HEARTBEAT,
+    max_duration: float = STREAM_MAX_DURATION,
+) -> AsyncIterator[str]:
+    """
+    Yields Server-Sent Events with one `count` event per app whose count (or error) differs from
+    what the client last received. The first round sends every app, or only the changed ones
+    when resuming from a known `last_event_id`. The generator only ever awaits, so an open
+    stream holds no thread; counts come from the notification cache, the poller's store or
+    upstream, exactly as for the batch endpoint.
+    """
+    sent = stream_resume_states.recall(last_event_id, user_identifier) or {}
+    current_id = last_event_id if sent else None
+    started = last_output = time.monotonic()
+
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+    while time.monotonic() - started < max_duration:
+        counts = await service.aget_notification_counts(user_identifier, app_ids)
+        events = []
+        for app_id, response in counts.items():
+            value = (response.count, response.error)
+            if sent.get(app_id) != value:
+                sent[app_id] = value
+                event_id = stream_resume_states.next_id()
+                events.append(_format_event(event_id, app_id, response))
+                stream_resume_states.remember(event_id, user_identifier, sent, previous_id=current_id)
+                current_id = event_id
+
+        now = time.monotonic()
+        if events:
+            yield ''.join(events)
+            last_output = now
+        elif now - last_output >= heartbeat:
+            yield ": heartbeat\n\n" # Comment line; keeps proxies from closing an idle connection
+            last_output = now
+        await asyncio.sleep(interval)
@@ -1,3 +1,169 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from config.schemas import AppLink
+from .breaker import CircuitBreaker, CircuitBreakerRegistry, CLOSED, HALF_OPEN, OPEN
+from .cache import CACHE_HIT, CACHE_STALE, ERROR_TTL, NotificationCountCache, ttl_for
+from .poller import NotificationPoller
+from .providers import NotificationError, NotificationProvider, PendingFetch
+from .providers import base as providers_base
+from .schemas import NotificationCountResponse
+
+
+class NotificationCountCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = NotificationCountCache(max_entries=2, stale_ttl=60.0)
+
+    def test_miss(self):
+        self.assertEqual(self.cache.get(('user', 'app')), (None, None, False))
+
+    def test_hit_within_ttl(self):
+        self.cache.set(('user', 'app'), NotificationCountResponse(count=3, cache='miss'), ttl=60.0)
+        response, state, should_refresh = self.cache.get(('user', 'app'))
+        self.assertEqual((response.count, response.cache, state, should_refresh), (3, None, CACHE_HIT, False))
+
+    def test_stale_entry_is_refreshed_by_one_caller(self):
+        self.cache.set(('user', 'app'), NotificationCountResponse(count=3), ttl=0.0)
+        response, state, should_refresh = self.cache.get(('user', 'app'))
+        self.assertEqual((response.count, state, should_refresh), (3, CACHE_STALE, True))
+        self.assertEqual(self.cache.get(('user', 'app'))[1:], (CACHE_STALE, False))
+        self.cache.release(('user', 'app')) # The refresh failed: the next caller retries
+        self.assertEqual(self.cache.get(('user', 'app'))[1:], (CACHE_STALE, True))
+
+    def test_entry_past_its_stale_window_is_dropped(self):
+        cache = NotificationCountCache(stale_ttl=0.0)
+        cache.set(('user', 'app'), NotificationCountResponse(count=3), ttl=0.0)
+        self.assertEqual(cache.get(('user', 'app')), (None, None, False))
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set(('user', 'a'), NotificationCountResponse(count=1), ttl=60.0)
+        self.cache.set(('user', 'b'), NotificationCountResponse(count=2), ttl=60.0)
+        self.cache.get(('user', 'a'))
+        self.cache.set(('user', 'c'), NotificationCountResponse(count=3), ttl=60.0)
+        self.assertEqual(self.cache.get(('user', 'b'))[1], None)
+        self.assertEqual(self.cache.get(('user', 'a'))[1], CACHE_HIT)
+        self.assertEqual(self.cache.get(('user', 'c'))[1], CACHE_HIT)
+
+    def test_invalidate_one_app_or_all_of_a_user(self):
+        cache = NotificationCountCache()
+        for key in (('user', 'a'), ('user', 'b'), ('other', 'a')):
+            cache.set(key, NotificationCountResponse(count=1), ttl=60.0)
+        cache.invalidate('user', 'a')
+        self.assertEqual(cache.get(('user', 'a'))[1], None)
+        self.assertEqual(cache.get(('user', 'b'))[1], CACHE_HIT)
+        cache.invalidate('user')
+        self.assertEqual(cache.get(('user', 'b'))[1], None)
+        self.assertEqual(cache.get(('other', 'a'))[1], CACHE_HIT)
+
+    def test_errors_are_cached_briefly(self):
+        self.assertEqual(ttl_for('vikunja', NotificationCountResponse(error='timeout')), ERROR_TTL)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker('http://upstream.invalid', failure_threshold=2, cooldown=30.0)
+
+    def _open(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+    def _end_cooldown(self):
+        self.breaker.opened_at -= self.breaker.cooldown
+
+    def test_opens_after_threshold_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_success_resets_the_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_probe_success_closes(self):
+        self._open()
+        self._end_cooldown()
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow_request()) # Only one probe at a time
+        self.breaker.record_success()
+        self.assertEqual((self.breaker.state, self.breaker.consecutive_failures), (CLOSED, 0))
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_half_open_probe_failure_reopens(self):
+        self._open()
+        self._end_cooldown()
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+
+class PollerBackoffTests(SimpleTestCase):
+    def setUp(self):
+        self.poller = NotificationPoller(service=object(), default_interval=60.0, intervals={}, jitter=0.0, max_backoff=900.0)
+
+    def test_interval_without_failures(self):
+        self.assertEqual(self.poller._interval_for('vikunja', 0), 60.0)
+
+    def test_interval_doubles_per_failure_up_to_max_backoff(self):
+        self.assertEqual(self.poller._interval_for('vikunja', 1), 120.0)
+        self.assertEqual(self.poller._interval_for('vikunja', 3), 480.0)
+        self.assertEqual(self.poller._interval_for('vikunja', 5), 900.0)
+
+    def test_interval_after_very_many_failures(self):
+        # An upstream down for days must not make the interval overflow
+        self.assertEqual(self.poller._interval_for('vikunja', 5000), 900.0)
+
+    def test_interval_never_below_the_provider_interval(self):
+        poller = NotificationPoller(service=object(), intervals={'slow': 3600.0}, jitter=0.0, max_backoff=900.0)
+        self.assertEqual(poller._interval_for('slow', 10), 3600.0)
+
+
+class _FailingProvider(NotificationProvider):
+    """Raises a given NotificationError from fetch_pages without any network I/O."""
+    type = 'failing'
+    title = 'Failing'
+
+    def __init__(self, error: NotificationError):
+        self.error = error
+
+    def request_url(self, pending):
+        return pending.app_link.url
+
+    async def fetch_pages(self, client, pending, timeout):
+        raise self.error
+
+    def parse(self, pending, pages):
+        raise AssertionError("not reached")
+
+
+class FetchCountBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = CircuitBreakerRegistry(failure_threshold=1, cooldown=0.0)
+        self.original_registry = providers_base.circuit_breakers
+        providers_base.circuit_breakers = self.registry
+        self.pending = PendingFetch('user', AppLink(id='app', title='App', icon='x', url='http://upstream.invalid/', type='failing'), 'key')
+        self.breaker = self.registry.for_url(self.pending.app_link.url)
+        self.breaker.record_failure() # Open; the zero cooldown makes the next request the half-open probe
+
+    def tearDown(self):
+        providers_base.circuit_breakers = self.original_registry
+
+    async def test_error_before_any_request_leaves_the_circuit_open(self):
+        response = await _FailingProvider(NotificationError("bad options", error_type='config_invalid')).fetch_count(self.pending)
+        self.assertEqual(response.error, 'config_invalid')
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertEqual(self.breaker.consecutive_failures, 1)
+        self.assertTrue(self.breaker.allow_request()) # The probe slot was released
+
+    async def test_error_about_a_real_response_closes_the_circuit(self):
+        error = NotificationError("too large", error_type='response_too_large', upstream_responded=True)
+        response = await _FailingProvider(error).fetch_count(self.pending)
+        self.assertEqual(response.error, 'response_too_large')
+        self.assertNotEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.consecutive_failures, 0)
@@ -1,8 +1,20 @@
+from django.conf import settings
 from django.urls import path
-from .views import AppNotificationsView
+from .views import (
+    AppNotificationsView, BatchNotificationsView, NotificationStreamView, UpstreamStatusView,
+    AsyncAppNotificationsView, AsyncBatchNotificationsView,
+)
 
 app_name = 'notifications'
 
+# Native async views when served over ASGI (see API_ASYNC_VIEWS in core/settings.py)
+BatchView = AsyncBatchNotificationsView if settings.API_ASYNC_VIEWS else BatchNotificationsView
+AppView = AsyncAppNotificationsView if settings.API_ASYNC_VIEWS else AppNotificationsView
+
 urlpatterns = [
-    path('<str:app_id>/', AppNotificationsView.as_view(), name='app_notifications'),
+    path('', BatchView.as_view(), name='batch_notifications'),
+    # Underscore-prefixed so they don't shadow the counts of apps with ids like "stream"
+    path('_stream/', NotificationStreamView.as_view(), name='notification_stream'),
+    path('_upstreams/', UpstreamStatusView.as_view(), name='upstream_status'),
+    path('<str:app_id>/', AppView.as_view(), name='app_notifications'),
 ]
@@ -1,65 +1,58 @@
 import logging
-from django.http import JsonResponse, HttpRequest
+from dataclasses import asdict
+from django.conf import settings
+from django.http import JsonResponse, HttpRequest, StreamingHttpResponse
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from .services import NotificationService, NotificationError
-from config.services import ConfigService as AppConfigService, ConfigError as AppConfigError
-from .schemas import NotificationCountResponse
+from .services import NotificationService
+from core.params import parse_app_ids
+from core.renderers import pydantic_response
+from config.principal import Principal, CONFIG_UNAVAILABLE, REMOTE_USER_MISSING
+from .schemas import NotificationCountResponse, BatchNotificationCountResponse
+from .streams import notification_event_stream
+from .breaker import circuit_breakers
+from .clients import upstream_pool
+from .providers import NotificationError, provider_registry
+from .singleflight import upstream_flights
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on app_ids per batch request
+BATCH_MAX_APPS = getattr(settings, 'NOTIFICATIONS_BATCH_MAX_APPS', 200)
+
+def identification_error(principal: Principal) -> tuple[dict, int]:
+    """Returns the (body, status) of the error response for a request whose user could not be identified."""
+    if principal.failure == CONFIG_UNAVAILABLE:
+        error_msg = "Forbidden: Cannot identify user due to main configuration error."
+        # Return as NotificationCountResponse for consistency if client expects that schema
+        return NotificationCountResponse(error=error_msg).model_dump(), status.HTTP_500_INTERNAL_SERVER_ERROR
+    elif principal.failure == REMOTE_USER_MISSING:
+        error_msg = "Unauthorized: User identification failed."
+        return NotificationCountResponse(error=error_msg).model_dump(), status.HTTP_401_UNAUTHORIZED
+    else: # Not useRemoteAuth, and 'default' user was not found/configured
+        error_msg = "Forbidden: Default user not configured."
+        return NotificationCountResponse(error=error_msg).model_dump(), status.HTTP_403_FORBIDDEN
+
+
 class AppNotificationsView(APIView):
     """
     API view to retrieve notification counts for a specific application.
     """
     notification_service = NotificationService()
-    app_config_service = AppConfigService() # For user identification
 
-    def _get_user_identifier(self, request: HttpRequest) -> str | None:
-        """Helper to identify the user based on app configuration."""
-        try:
-            main_config = self.app_config_service.load_config()
-        except AppConfigError:
-            logger.error("Notifications View: Could not load main application config to identify user.")
-            return None
-
-        user_identifier = None
-        if main_config.useRemoteAuth:
-            user_email_header = (
-                request.META.get('HTTP_REMOTE_USER') or
-                request.META.get('HTTP_X_FORWARDED_USER') or
-                ''
-            ).lower()
-            if user_email_header:
-                user_identifier = user_email_header
-        else:
-            if main_config.users and 'default' in main_config.users:
-                user_identifier = 'default'
-        
-        return user_identifier
+    def _identification_error_response(self, request: HttpRequest) -> Response:
+        """Builds the error response for a request whose user could not be identified."""
+        body, status_code = identification_error(request.principal)
+        return Response(body, status=status_code)
 
     def get(self, request: HttpRequest, app_id: str, *args, **kwargs):
-        user_identifier = self._get_user_identifier(request)
+        user_identifier = request.principal.identifier # Resolved by config.middleware.PrincipalMiddleware
 
         if not user_identifier:
-            main_config_loaded = True
-            try:
-                main_config = self.app_config_service.load_config()
-            except AppConfigError:
-                main_config_loaded = False
-
-            if not main_config_loaded:
-                error_msg = "Forbidden: Cannot identify user due to main configuration error."
-                # Return as NotificationCountResponse for consistency if client expects that schema
-                return Response(NotificationCountResponse(error=error_msg).model_dump(), status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            elif main_config.useRemoteAuth:
-                error_msg = "Unauthorized: User identification failed."
-                return Response(NotificationCountResponse(error=error_msg).model_dump(), status=status.HTTP_401_UNAUTHORIZED)
-            else: # Not useRemoteAuth, and 'default' user was not found/configured
-                error_msg = "Forbidden: Default user not configured."
-                return Response(NotificationCountResponse(error=error_msg).model_dump(), status=status.HTTP_403_FORBIDDEN)
+            return self._identification_error_response(request)
 
         try:
             # The service method already returns a NotificationCountResponse Pydantic model
@@ -67,8 +60,8 @@ class AppNotificationsView(APIView):
                 user_identifier=user_identifier,
                 app_id=app_id
             )
-            # .model_dump() converts Pydantic model to dict for DRF Response
-            return Response(notification_data.model_dump(), status=status.HTTP_200_OK)
+            # Serialized straight to JSON bytes, skipping model_dump() and the DRF renderer
+            return pydantic_response(notification_data, status=status.HTTP_200_OK)
         except NotificationError as e: # Custom errors from the service
             logger.error(f"Notification service error for user {user_identifier}, app {app_id}: {e}")
             return Response(NotificationCountResponse(error=e.error_type or str(e)).model_dump(), status=e.status_code)
@@ -78,3 +71,142 @@ class AppNotificationsView(APIView):
                 NotificationCountResponse(error="An unexpected server error occurred.").model_dump(),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class BatchNotificationsView(AppNotificationsView):
+    """
+    API view to retrieve notification counts for many applications in one request.
+    `?app_ids=a,b,c` (or repeated `app_ids` parameters) selects the apps; without it,
+    every notification-capable app visible to the user's role is included.
+    Upstream requests run concurrently, so latency is that of the slowest app.
+    """
+    def get(self, request: HttpRequest, *args, **kwargs):
+        user_identifier = request.principal.identifier
+
+        if not user_identifier:
+            return self._identification_error_response(request)
+
+        app_ids = parse_app_ids(request)
+        if not app_ids:
+            app_ids = self.notification_service.visible_notification_app_ids(user_identifier, request.principal.permissions)
+        if len(app_ids) > BATCH_MAX_APPS:
+            return Response({'error': f"Too many app_ids requested (maximum {BATCH_MAX_APPS})."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = self.notification_service.get_notification_counts(user_identifier=user_identifier, app_ids=app_ids)
+            return pydantic_response(BatchNotificationCountResponse(results=results), status=status.HTTP_200_OK)
+        except Exception as e: # Catch-all for unexpected errors
+            logger.error(f"Unexpected error fetching batch notifications for user {user_identifier}: {e}")
+            return Response({'error': "An unexpected server error occurred."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class NotificationStreamView(View):
+    """
+    Server-Sent Events stream of notification counts (`text/event-stream`).
+    Selects apps like BatchNotificationsView and pushes a `count` event per app only when its
+    count changes, plus periodic heartbeat comments. Reconnecting clients send Last-Event-ID
+    and only receive what changed since. Requires the ASGI server (API_SERVER=asgi): under WSGI
+    Django collects a streaming response's whole async iterator before sending anything, so a
+    stream would hold the worker for its full duration and deliver no events.
+    """
+    notification_service = NotificationService()
+
+    async def get(self, request: HttpRequest, *args, **kwargs):
+        if not settings.API_ASYNC_VIEWS:
+            return JsonResponse({'error': "Notification streaming requires the ASGI server (API_SERVER=asgi)."}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        user_identifier = request.principal.identifier
+        if not user_identifier:
+            body, status_code = identification_error(request.principal)
+            return JsonResponse(body, status=status_code)
+
+        app_ids = parse_app_ids(request)
+        if not app_ids:
+            app_ids = await self.notification_service.avisible_notification_app_ids(user_identifier, request.principal.permissions)
+        if len(app_ids) > BATCH_MAX_APPS:
+            return JsonResponse({'error': f"Too many app_ids requested (maximum {BATCH_MAX_APPS})."}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            notification_event_stream(
+                self.notification_service,
+                user_identifier,
+                app_ids,
+                last_event_id=request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get('last_event_id'),
+            ),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no' # Don't let reverse proxies buffer the stream
+        return response
+
+
+class AsyncAppNotificationsView(View):
+    """
+    Native async version of AppNotificationsView, routed instead of it when the API is served
+    over ASGI (settings.API_ASYNC_VIEWS). Waiting on upstream apps holds no thread.
+    """
+    notification_service = NotificationService()
+
+    def _identification_error_response(self, request: HttpRequest) -> JsonResponse:
+        body, status_code = identification_error(request.principal)
+        return JsonResponse(body, status=status_code)
+
+    async def get(self, request: HttpRequest, app_id: str, *args, **kwargs):
+        user_identifier = request.principal.identifier
+        if not user_identifier:
+            return self._identification_error_response(request)
+
+        try:
+            results = await self.notification_service.aget_notification_counts(user_identifier, [app_id])
+            return pydantic_response(results[app_id], status=status.HTTP_200_OK)
+        except Exception as e: # Catch-all for unexpected errors
+            logger.error(f"Unexpected error fetching notifications for user {user_identifier}, app {app_id}: {e}")
+            return JsonResponse(
+                NotificationCountResponse(error="An unexpected server error occurred.").model_dump(),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class AsyncBatchNotificationsView(AsyncAppNotificationsView):
+    """Native async version of BatchNotificationsView (see AsyncAppNotificationsView)."""
+    async def get(self, request: HttpRequest, *args, **kwargs):
+        user_identifier = request.principal.identifier
+        if not user_identifier:
+            return self._identification_error_response(request)
+
+        app_ids = parse_app_ids(request)
+        if not app_ids:
+            app_ids = await self.notification_service.avisible_notification_app_ids(user_identifier, request.principal.permissions)
+        if len(app_ids) > BATCH_MAX_APPS:
+            return JsonResponse({'error': f"Too many app_ids requested (maximum {BATCH_MAX_APPS})."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = await self.notification_service.aget_notification_counts(user_identifier, app_ids)
+            return pydantic_response(BatchNotificationCountResponse(results=results), status=status.HTTP_200_OK)
+        except Exception as e: # Catch-all for unexpected errors
+            logger.error(f"Unexpected error fetching batch notifications for user {user_identifier}: {e}")
+            return JsonResponse({'error': "An unexpected server error occurred."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class UpstreamStatusView(APIView):
+    """
+    Operator view of upstream health: the circuit breaker state of every notification
+    origin, the pooled connections, request coalescing and the registered providers' capabilities. Only available to roles with unrestricted access ("*").
+    """
+    def get(self, request: HttpRequest, *args, **kwargs):
+        user_identifier = request.principal.identifier
+
+        if not user_identifier:
+            body, status_code = identification_error(request.principal)
+            return Response(body, status=status_code)
+
+        role_permissions = request.principal.permissions
+        if role_permissions is None or not role_permissions.matcher.allow_all:
+            return Response({'error': "Forbidden: Upstream status requires unrestricted access."}, status=status.HTTP_403_FORBIDDEN)
+
+        return Response({
+            'breakers': circuit_breakers.status(),
+            'pool': upstream_pool.stats(),
+            'single_flight': upstream_flights.stats(),
+            'providers': {app_type: asdict(capabilities) for app_type, capabilities in provider_registry.capabilities().items()},
+        }, status=status.HTTP_200_OK)
@@ -1,42 +1,77 @@
+import copy
 import json
+import time
 import base64
 import hashlib
+import threading
+from collections import OrderedDict
 from django.conf import settings
 from django.db import models
 from django.core.exceptions import ValidationError
-from cryptography.fernet import Fernet, InvalidToken
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 
 # It's good practice to have a dedicated logger for your custom fields or app utilities
 import logging
 logger = logging.getLogger(__name__)
 
+# Opt-in cache of decrypted EncryptedJSONField values, so rows loaded over and over (e.g. API keys
+# read on every notification fetch) don't repeat the Fernet decrypt and JSON parse.
+DECRYPTED_CACHE_ENABLED = getattr(settings, 'ENCRYPTED_FIELD_CACHE_ENABLED', False)
+DECRYPTED_CACHE_MAX_ENTRIES = getattr(settings, 'ENCRYPTED_FIELD_CACHE_MAX_ENTRIES', 1000)
+DECRYPTED_CACHE_TTL = getattr(settings, 'ENCRYPTED_FIELD_CACHE_TTL', 300.0) # Seconds plaintext may stay in memory
+
 class EncryptionService:
     """
-    A simple service to encapsulate Fernet key generation and encryption/decryption.
+    A simple service to encapsulate Fernet key generation and encryption/decryption, with key rotation.
+
+    Keys are derived from the secrets in settings.FIELD_ENCRYPTION_KEYS, newest first (default:
+    SECRET_KEY followed by SECRET_KEY_FALLBACKS). The first key encrypts; all of them are tried
+    when decrypting, so rows written under an older key stay readable until
+    `manage.py reencrypt_settings` has rewritten them under the current one.
     """
     _fernet_instance = None
+    _primary_instance = None
 
-    @classmethod
-    def _get_key(cls):
+    @staticmethod
+    def _derive_key(secret: str) -> bytes:
         """
-        Derives a 32-byte key suitable for Fernet from Django's SECRET_KEY.
-        Uses SHA256 hash of the SECRET_KEY.
+        Derives a 32-byte key suitable for Fernet from a secret.
+        Uses SHA256 hash of the secret.
         """
-        # SECRET_KEY should be bytes or a string that can be encoded
-        secret_key_bytes = getattr(settings, 'SECRET_KEY', '').encode('utf-8')
-        # Use SHA256 to get a 32-byte hash
-        hashed_key = hashlib.sha256(secret_key_bytes).digest()
+        # The secret should be bytes or a string that can be encoded
+        hashed_key = hashlib.sha256(secret.encode('utf-8')).digest()
         return base64.urlsafe_b64encode(hashed_key) # Fernet keys must be url-safe base64 encoded
 
     @classmethod
-    def get_fernet(cls):
+    def _get_keys(cls) -> list:
+        secrets = getattr(settings, 'FIELD_ENCRYPTION_KEYS', None) or [
+            getattr(settings, 'SECRET_KEY', ''),
+            *getattr(settings, 'SECRET_KEY_FALLBACKS', []),
+        ]
+        return [cls._derive_key(secret) for secret in secrets if secret]
+
+    @classmethod
+    def _get_key(cls):
+        """Returns the current (encrypting) key."""
+        keys = cls._get_keys()
+        return keys[0] if keys else None
+
+    @classmethod
+    def get_fernet(cls) -> MultiFernet:
         if cls._fernet_instance is None:
-            key = cls._get_key()
-            if not key:
+            keys = cls._get_keys()
+            if not keys:
                 raise ValueError("Encryption key could not be derived. Is SECRET_KEY set?")
-            cls._fernet_instance = Fernet(key)
+            fernets = [Fernet(key) for key in keys]
+            cls._primary_instance = fernets[0]
+            cls._fernet_instance = MultiFernet(fernets)
         return cls._fernet_instance
 
+    @classmethod
+    def reset(cls):
+        """Forgets the derived keys, e.g. after the key settings changed."""
+        cls._fernet_instance = cls._primary_instance = None
+
     @classmethod
     def encrypt(cls, data_bytes: bytes) -> bytes:
         return cls.get_fernet().encrypt(data_bytes)
@@ -45,6 +80,78 @@ class EncryptionService:
     def decrypt(cls, encrypted_bytes: bytes) -> bytes:
         return cls.get_fernet().decrypt(encrypted_bytes)
 
+    @classmethod
+    def is_current(cls, encrypted_bytes: bytes) -> bool:
+        """Whether a token was encrypted with the current key (so re-encrypting it is unnecessary)."""
+        cls.get_fernet()
+        try:
+            cls._primary_instance.decrypt(encrypted_bytes)
+            return True
+        except InvalidToken:
+            return False
+
+    @classmethod
+    def rotate(cls, encrypted_bytes: bytes) -> bytes:
+        """Decrypts a token with any known key and encrypts it again with the current key."""
+        return cls.get_fernet().rotate(encrypted_bytes)
+
+
+class EncryptedValue(str):
+    """An already encrypted EncryptedJSONField value, stored as is (used when re-encrypting rows in bulk)."""
+
+
+class DecryptedValueCache:
+    """
+    A thread-safe, size-bounded LRU cache from ciphertext (by digest) to the decrypted value.
+
+    Fernet uses a random IV, so every save produces a new ciphertext: a cached value can never be
+    served for data that changed. Entries expire after `ttl` seconds so plaintext doesn't stay in
+    memory indefinitely, and callers always get a copy they are free to mutate.
+    """
+    def __init__(self, max_entries: int = DECRYPTED_CACHE_MAX_ENTRIES, ttl: float = DECRYPTED_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict() # digest -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(ciphertext: str) -> bytes:
+        return hashlib.blake2b(ciphertext.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, ciphertext: str):
+        """Returns a copy of the cached value for a ciphertext, or None."""
+        key = self._key(ciphertext)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[0]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def set(self, ciphertext: str, value):
+        entry = (time.monotonic() + self.ttl, copy.deepcopy(value))
+        key = self._key(ciphertext)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False) # Evict the least recently used entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Process-wide cache used by every EncryptedJSONField when DECRYPTED_CACHE_ENABLED
+decrypted_value_cache = DecryptedValueCache()
+
 
 class EncryptedJSONField(models.TextField):
     """
@@ -74,17 +181,25 @@ class EncryptedJSONField(models.TextField):
             return self.default_value() if callable(self.default_value) else self.default_value
 
 
+        if DECRYPTED_CACHE_ENABLED:
+            cached = decrypted_value_cache.get(value)
+            if cached is not None:
+                return cached
+
         try:
             # The value from DB is a string, needs to be encoded to bytes for Fernet
             encrypted_bytes = value.encode('utf-8')
             decrypted_bytes = EncryptionService.decrypt(encrypted_bytes)
             decrypted_string = decrypted_bytes.decode('utf-8')
-            return json.loads(decrypted_string)
+            decrypted_value = json.loads(decrypted_string)
+            if DECRYPTED_CACHE_ENABLED:
+                decrypted_value_cache.set(value, decrypted_value)
+            return decrypted_value
         except InvalidToken:
             logger.error(f"EncryptedJSONField: InvalidToken during decryption. Data may be corrupted or not encrypted. Value: {value[:50]}...")
             # Fallback to default or raise error. For safety, return default.
             # This could happen if data was written before encryption was active.
-            # Or if the SECRET_KEY changed without a data migration strategy.
+            # Or if the SECRET_KEY changed without keeping the old one in SECRET_KEY_FALLBACKS / FIELD_ENCRYPTION_KEYS.
             return self.default_value() if callable(self.default_value) else self.default_value
         except (json.JSONDecodeError, UnicodeDecodeError) as e:
             logger.error(f"EncryptedJSONField: Error decoding/deserializing data: {e}. Value: {value[:50]}...")
@@ -141,6 +256,8 @@ class EncryptedJSONField(models.TextField):
         """
         Converts Python dictionary to database format (encrypted string).
         """
+        if isinstance(value, EncryptedValue):
+            return str(value)
         if value is None:
             # Respect `null=True` if set on the field instance in the model
             if self.null:
@@ -0,0 +1,116 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Optional, Tuple
+
+from cryptography.fernet import InvalidToken
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.db.models.functions import Cast
+
+from users.fields import EncryptionService, EncryptedValue
+from users.models import UserApplicationSetting
+
+# Outcomes of rotate_token
+CURRENT = 'current' # Already encrypted with the current key (or empty)
+ROTATED = 'rotated'
+FAILED = 'failed' # No configured key decrypts it
+
+
+def rotate_token(token: Optional[str]) -> Tuple[str, Optional[str]]:
+    """Returns (outcome, new token). Module-level so process pools can pickle it."""
+    if not token:
+        return CURRENT, None
+    token_bytes = token.encode('utf-8')
+    if EncryptionService.is_current(token_bytes):
+        return CURRENT, None
+    try:
+        return ROTATED, EncryptionService.rotate(token_bytes).decode('utf-8')
+    except InvalidToken:
+        return FAILED, None
+
+
+def raw_settings(queryset):
+    """(pk, ciphertext) pairs, bypassing EncryptedJSONField's decryption."""
+    return queryset.annotate(raw_settings=Cast('settings', output_field=models.TextField())).values_list('pk', 'raw_settings')
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-encrypts UserApplicationSetting.settings with the current key (the first of FIELD_ENCRYPTION_KEYS). "
+        "Rows are streamed in primary key order and written back in small batches, so the table is never "
+        "loaded into memory or locked as a whole. Rows already using the current key are skipped, "
+        "so the command can be interrupted and run again (or resumed with --after-pk)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows read (and re-encrypted) per round.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per UPDATE statement when writing back.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Parallel re-encryption workers.")
+        parser.add_argument('--processes', action='store_true', help="Use worker processes instead of threads.")
+        parser.add_argument('--after-pk', type=int, default=0, help="Only process rows with a greater primary key.")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be re-encrypted without writing.")
+
+    def handle(self, *args, **options):
+        chunk_size, batch_size = options['chunk_size'], options['batch_size']
+        if chunk_size < 1 or batch_size < 1 or options['workers'] < 1:
+            raise CommandError("--chunk-size, --batch-size and --workers must be positive.")
+        EncryptionService.get_fernet() # Fail early if no key can be derived
+
+        rows = raw_settings(
+            UserApplicationSetting.objects.filter(pk__gt=options['after_pk']).order_by('pk')
+        ).iterator(chunk_size=chunk_size)
+        totals = {CURRENT: 0, ROTATED: 0, FAILED: 0, 'changed': 0}
+        failed_pks = []
+        last_pk = options['after_pk']
+        started = time.perf_counter()
+
+        executor_class = ProcessPoolExecutor if options['processes'] else ThreadPoolExecutor
+        with executor_class(max_workers=options['workers']) as executor:
+            while chunk := list(islice(rows, chunk_size)):
+                pks, tokens = zip(*chunk)
+                outcomes = executor.map(rotate_token, tokens, chunksize=max(1, len(chunk) // (options['workers'] * 4)))
+                rotated: Dict[int, Tuple[str, str]] = {}
+                for pk, old_token, (outcome, new_token) in zip(pks, tokens, outcomes):
+                    totals[outcome] += 1
+                    if outcome == ROTATED:
+                        rotated[pk] = (old_token, new_token)
+                    elif outcome == FAILED:
+                        failed_pks.append(pk)
+
+                if rotated and not options['dry_run']:
+                    written = self._write(rotated, batch_size)
+                    totals['changed'] += len(rotated) - written
+                last_pk = pks[-1]
+
+                scanned = sum(totals[outcome] for outcome in (CURRENT, ROTATED, FAILED))
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{scanned} rows scanned ({totals[ROTATED]} re-encrypted, {totals[CURRENT]} current, "
+                    f"{totals[FAILED]} unreadable), {scanned / elapsed:.0f} rows/s, last pk {last_pk}"
+                )
+
+        if failed_pks:
+            self.stderr.write(
+                f"{len(failed_pks)} rows could not be decrypted with any configured key "
+                f"(first pks: {failed_pks[:10]}); they were left unchanged."
+            )
+        if totals['changed']:
+            self.stdout.write(f"{totals['changed']} rows changed while running and were skipped; they already use the current key.")
+        verb = "Would re-encrypt" if options['dry_run'] else "Re-encrypted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {totals[ROTATED]} rows in {time.perf_counter() - started:.1f}s (last pk {last_pk})."
+        ))
+
+    def _write(self, rotated: Dict[int, Tuple[str, str]], batch_size: int) -> int:
+        """Writes re-encrypted tokens back, skipping rows the app rewrote since they were read. Returns rows written."""
+        with transaction.atomic():
+            current = dict(raw_settings(UserApplicationSetting.objects.select_for_update().filter(pk__in=rotated)))
+            updates = [
+                UserApplicationSetting(pk=pk, settings=EncryptedValue(new_token))
+                for pk, (old_token, new_token) in rotated.items()
+                if current.get(pk) == old_token
+            ]
+            UserApplicationSetting.objects.bulk_update(updates, ['settings'], batch_size=batch_size)
+        return len(updates)
@@ -1,6 +1,9 @@
+import logging
 from rest_framework import serializers
 from .models import UserApplicationSetting
-from config.services import ConfigService as AppConfigService # For validating app_id
+from config.services import get_config_service # For validating app_id
+
+logger = logging.getLogger(__name__)
 
 class UserApplicationSettingSerializer(serializers.ModelSerializer):
     settings = serializers.JSONField() # Explicitly define as JSONField
@@ -21,15 +24,13 @@ class UserApplicationSettingSerializer(serializers.ModelSerializer):
         """
         Check if the app_id exists in the main application configuration.
         """
-        app_config_service = AppConfigService()
         try:
-            main_config = app_config_service.load_config()
-            if not main_config.apps or value not in main_config.apps:
-                raise serializers.ValidationError(f"Application with app_id '{value}' not found in system configuration.")
+            config_index = get_config_service().get_snapshot().index
         except Exception as e: # Catch broader exceptions from config loading
-            # Log this error server-side
-            # logger.error(f"Could not validate app_id due to config service error: {e}")
+            logger.error(f"Could not validate app_id due to config service error: {e}")
             raise serializers.ValidationError(f"Could not validate app_id '{value}' due to a configuration service error.")
+        if not config_index.has_app(value):
+            raise serializers.ValidationError(f"Application with app_id '{value}' not found in system configuration.")
         return value
 
 class UserApplicationSettingUpdateSerializer(serializers.ModelSerializer):
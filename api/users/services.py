@@ -0,0 +1,150 @@
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import Signal
+
+from .fields import decrypted_value_cache
+from .models import UserApplicationSetting
+
+logger = logging.getLogger(__name__)
+
+# Seconds a user's loaded settings are reused across requests (0 disables reuse; signals invalidate on change)
+USER_SETTINGS_CACHE_TTL = getattr(settings, 'USER_SETTINGS_CACHE_TTL', 5.0)
+USER_SETTINGS_CACHE_MAX_USERS = getattr(settings, 'USER_SETTINGS_CACHE_MAX_USERS', 1000)
+
+# Sent after upsert_user_settings commits (bulk_create sends no post_save), with `user_identifier` and the written `app_ids`
+settings_bulk_updated = Signal()
+
+
+class UserSettings:
+    """
+    All of one user's UserApplicationSetting rows, loaded with a single query (so each row is
+    decrypted once). Instances may be shared between threads: accessors return copies.
+    """
+    def __init__(self, user_identifier: str, rows: Dict[str, UserApplicationSetting]):
+        self.user_identifier = user_identifier
+        self._rows = rows
+
+    @classmethod
+    def load(cls, user_identifier: str) -> 'UserSettings':
+        rows = UserApplicationSetting.objects.filter(user_identifier=user_identifier)
+        return cls(user_identifier, {row.app_id: row for row in rows})
+
+    @classmethod
+    async def aload(cls, user_identifier: str) -> 'UserSettings':
+        rows = UserApplicationSetting.objects.filter(user_identifier=user_identifier)
+        return cls(user_identifier, {row.app_id: row async for row in rows})
+
+    def app_ids(self) -> List[str]:
+        return list(self._rows)
+
+    def get(self, app_id: str) -> Optional[UserApplicationSetting]:
+        """Returns a copy of the user's row for an app, or None."""
+        row = self._rows.get(app_id)
+        if row is None:
+            return None
+        row = copy.copy(row)
+        row.settings = copy.deepcopy(row.settings)
+        return row
+
+    def settings_for(self, app_id: str) -> dict:
+        """Returns a copy of the user's settings dict for an app ({} if there are none)."""
+        row = self._rows.get(app_id)
+        return copy.deepcopy(row.settings) if row is not None and row.settings else {}
+
+    def api_key(self, app_id: str) -> Optional[str]:
+        row = self._rows.get(app_id)
+        return (row.settings or {}).get('api_key') if row is not None else None
+
+
+class UserSettingsStore:
+    """
+    Hands out UserSettings per user, reusing a user's loaded settings for `ttl` seconds across
+    requests. Changes through the ORM invalidate the user right away (see users.signals); bulk
+    writes, which send no signals, must call `invalidate` themselves.
+    """
+    def __init__(self, ttl: float = USER_SETTINGS_CACHE_TTL, max_users: int = USER_SETTINGS_CACHE_MAX_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._entries: 'OrderedDict[str, Tuple[float, UserSettings]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, user_identifier: str) -> Optional[UserSettings]:
+        with self._lock:
+            entry = self._entries.get(user_identifier)
+            if entry is not None and time.monotonic() < entry[0]:
+                self._entries.move_to_end(user_identifier)
+                return entry[1]
+        return None
+
+    def _remember(self, user_identifier: str, user_settings: UserSettings, now: float):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_identifier] = (now + self.ttl, user_settings)
+            self._entries.move_to_end(user_identifier)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False) # Evict the least recently used user
+
+    def for_user(self, user_identifier: str) -> UserSettings:
+        user_settings = self._cached(user_identifier)
+        if user_settings is None:
+            now = time.monotonic()
+            user_settings = UserSettings.load(user_identifier)
+            self._remember(user_identifier, user_settings, now)
+        return user_settings
+
+    async def afor_user(self, user_identifier: str) -> UserSettings:
+        """for_user over the async ORM."""
+        user_settings = self._cached(user_identifier)
+        if user_settings is None:
+            now = time.monotonic()
+            user_settings = await UserSettings.aload(user_identifier)
+            self._remember(user_identifier, user_settings, now)
+        return user_settings
+
+    def invalidate(self, user_identifier: Optional[str] = None):
+        """Forgets one user's settings, or everyone's if `user_identifier` is None."""
+        with self._lock:
+            if user_identifier is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_identifier, None)
+
+
+# Process-wide store shared by the settings views and the notification service
+user_settings_store = UserSettingsStore()
+
+
+def upsert_user_settings(user_identifier: str, settings_by_app: Mapping[str, dict]) -> List[UserApplicationSetting]:
+    """
+    Creates or replaces a user's settings for many apps with one INSERT ... ON CONFLICT DO UPDATE
+    statement on (user_identifier, app_id). `settings_by_app` must already be validated.
+    bulk_create sends no model signals, so caches are invalidated here and `settings_bulk_updated`
+    is sent once the transaction has committed.
+    """
+    rows = [
+        UserApplicationSetting(user_identifier=user_identifier, app_id=app_id, settings=app_settings)
+        for app_id, app_settings in settings_by_app.items()
+    ]
+    with transaction.atomic():
+        UserApplicationSetting.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['user_identifier', 'app_id'],
+            update_fields=['settings', 'updated_at'],
+        )
+        transaction.on_commit(lambda: _after_bulk_update(user_identifier, list(settings_by_app)))
+    return rows
+
+
+def _after_bulk_update(user_identifier: str, app_ids: List[str]):
+    user_settings_store.invalidate(user_identifier)
+    decrypted_value_cache.clear()
+    settings_bulk_updated.send(sender=UserApplicationSetting, user_identifier=user_identifier, app_ids=app_ids)
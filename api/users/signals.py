@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .fields import decrypted_value_cache
+from .models import UserApplicationSetting
+from .services import user_settings_store
+
+
+@receiver(post_save, sender=UserApplicationSetting)
+@receiver(post_delete, sender=UserApplicationSetting)
+def clear_decrypted_settings(sender, instance: UserApplicationSetting, **kwargs):
+    """
+    Drops cached plaintext once settings change or go away. Entries are keyed by ciphertext, which
+    isn't known here, so the whole cache is cleared; settings change rarely enough for that to be cheap.
+    """
+    decrypted_value_cache.clear()
+
+
+@receiver(post_save, sender=UserApplicationSetting)
+@receiver(post_delete, sender=UserApplicationSetting)
+def invalidate_user_settings(sender, instance: UserApplicationSetting, **kwargs):
+    """Makes the next read of this user's settings go back to the database."""
+    user_settings_store.invalidate(instance.user_identifier)
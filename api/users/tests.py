@@ -1,3 +1,61 @@
-from django.test import TestCase
+import json
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from config.tests import sample_config, use_config
+from .fields import EncryptionService
+from .management.commands.reencrypt_settings import raw_settings
+from .models import UserApplicationSetting
+
+
+class BulkSettingsViewTests(TestCase):
+    def setUp(self):
+        self.enterContext(use_config(sample_config()))
+
+    def post(self, data):
+        return self.client.post('/api/users/settings/', json.dumps(data), content_type='application/json')
+
+    def test_unknown_app_ids_are_rejected_and_nothing_is_written(self):
+        response = self.post({'app-sonarr': {'api_key': 'a'}, 'app-missing': {'api_key': 'b'}})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'errors': {'app-missing': "Application not found in system configuration."}})
+        self.assertFalse(UserApplicationSetting.objects.exists())
+
+    def test_valid_settings_are_upserted(self):
+        UserApplicationSetting.objects.create(user_identifier='default', app_id='app-sonarr', settings={'api_key': 'old'})
+        response = self.post({'app-sonarr': {'api_key': 'new'}, 'app-radarr': {'api_key': 'r'}})
+        self.assertEqual(response.status_code, 200)
+        stored = {setting.app_id: setting.settings for setting in UserApplicationSetting.objects.filter(user_identifier='default')}
+        self.assertEqual(stored, {'app-sonarr': {'api_key': 'new'}, 'app-radarr': {'api_key': 'r'}})
+
+
+class ReencryptSettingsTests(TestCase):
+    def setUp(self):
+        self.addCleanup(EncryptionService.reset)
+        with override_settings(FIELD_ENCRYPTION_KEYS=['old-key']):
+            EncryptionService.reset()
+            for app_id in ('app-sonarr', 'app-radarr'):
+                UserApplicationSetting.objects.create(user_identifier='default', app_id=app_id, settings={'api_key': app_id})
+        EncryptionService.reset()
+
+    def reencrypt(self) -> str:
+        out = StringIO()
+        call_command('reencrypt_settings', '--workers=1', stdout=out)
+        return out.getvalue()
+
+    @override_settings(FIELD_ENCRYPTION_KEYS=['new-key', 'old-key'])
+    def test_rotates_old_rows_then_skips_current_ones(self):
+        self.assertIn("Re-encrypted 2 rows", self.reencrypt())
+        tokens = dict(raw_settings(UserApplicationSetting.objects.all()))
+        self.assertTrue(all(EncryptionService.is_current(token.encode('utf-8')) for token in tokens.values()))
+
+        output = self.reencrypt()
+        self.assertIn("(0 re-encrypted, 2 current, 0 unreadable)", output)
+        self.assertIn("Re-encrypted 0 rows", output)
+        self.assertEqual(dict(raw_settings(UserApplicationSetting.objects.all())), tokens)
+        self.assertEqual(
+            {setting.app_id: setting.settings for setting in UserApplicationSetting.objects.all()},
+            {'app-sonarr': {'api_key': 'app-sonarr'}, 'app-radarr': {'api_key': 'app-radarr'}},
+        )
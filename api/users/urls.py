@@ -1,8 +1,20 @@
+from django.conf import settings
 from django.urls import path
-from .views import UserAppSettingsView
+from django.views.decorators.csrf import csrf_exempt
+from .views import UserAppSettingsView, UserAppSettingsBulkView, AsyncUserAppSettingsView, AsyncUserAppSettingsBulkView
 
 app_name = 'users'
 
+# Native async views when served over ASGI (see API_ASYNC_VIEWS in core/settings.py).
+# Like DRF's APIView, they are exempt from CSRF checks (the API identifies users by proxy headers, not cookies).
+if settings.API_ASYNC_VIEWS:
+    settings_view = csrf_exempt(AsyncUserAppSettingsView.as_view())
+    settings_bulk_view = csrf_exempt(AsyncUserAppSettingsBulkView.as_view())
+else:
+    settings_view = UserAppSettingsView.as_view()
+    settings_bulk_view = UserAppSettingsBulkView.as_view()
+
 urlpatterns = [
-    path('settings/<str:app_id>/', UserAppSettingsView.as_view(), name='user_app_settings'),
+    path('settings/', settings_bulk_view, name='user_app_settings_bulk'),
+    path('settings/<str:app_id>/', settings_view, name='user_app_settings'),
 ]
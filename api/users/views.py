@@ -1,16 +1,50 @@
+import json
 import logging
-from django.http import JsonResponse, HttpRequest
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, HttpRequest, HttpResponse
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ParseError
 
 from .models import UserApplicationSetting
+from .services import user_settings_store, upsert_user_settings
 from .serializers import UserApplicationSettingSerializer, UserApplicationSettingUpdateSerializer
-from config.services import ConfigService as AppConfigService, ConfigError as AppConfigError
-from config.schemas import AppLink, NavCategory # Added import
+from core.params import parse_app_ids
+from config.principal import Principal, CONFIG_UNAVAILABLE, REMOTE_USER_MISSING
+from config.services import ConfigError as AppConfigError, get_config_service
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on apps per bulk settings request
+BULK_MAX_APPS = getattr(settings, 'USER_SETTINGS_BULK_MAX_APPS', 200)
+
+def _identification_error(principal: Principal) -> JsonResponse:
+    """Builds the error response for a request whose user could not be identified."""
+    if principal.failure == CONFIG_UNAVAILABLE:
+        error_msg = "Forbidden: Cannot identify user due to main configuration error."
+        return JsonResponse({'error': error_msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    elif principal.failure == REMOTE_USER_MISSING:
+        error_msg = "Unauthorized: User identification failed (Remote auth header missing or invalid)."
+        return JsonResponse({'error': error_msg}, status=status.HTTP_401_UNAUTHORIZED)
+    else:
+        error_msg = "Forbidden: Default user not configured or user identification failed for non-remote authentication mode."
+        return JsonResponse({'error': error_msg}, status=status.HTTP_403_FORBIDDEN)
+
+
+def _parse_json_body(request: HttpRequest):
+    """
+    Decodes a JSON request body for the async views (which don't go through DRF's parsers),
+    like DRF's JSONParser does: an empty body is an empty object, invalid JSON raises ParseError.
+    """
+    try:
+        return json.loads(request.body or b'{}')
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ParseError(f'JSON parse error - {e}')
+
+
 class UserAppSettingsView(APIView):
     """
     API view to manage user-specific application settings.
@@ -18,48 +52,16 @@ class UserAppSettingsView(APIView):
     Supports GET to retrieve settings for a given app_id for the identified user.
     Supports DELETE to remove settings for a given app_id for the identified user.
     """
-    app_config_service = AppConfigService()
+    app_config_service = get_config_service()
 
-    def _get_user_identifier(self, request: HttpRequest) -> str | None:
-        """Helper to identify the user based on app configuration (remote auth or default)."""
-        try:
-            main_config = self.app_config_service.load_config()
-        except AppConfigError:
-            logger.error("Could not load main application config to identify user for settings update.")
-            return None
-
-        user_identifier = None
-        if main_config.useRemoteAuth:
-            user_email_header = (
-                request.META.get('HTTP_REMOTE_USER') or
-                request.META.get('HTTP_X_FORWARDED_USER') or
-                ''
-            ).lower()
-            if user_email_header:
-                user_identifier = user_email_header
-        else:
-            if main_config.users and 'default' in main_config.users:
-                user_identifier = 'default'
-        return user_identifier
+    def _identification_error_response(self, request: HttpRequest) -> JsonResponse:
+        """Builds the error response for a request whose user could not be identified."""
+        return _identification_error(request.principal)
 
     def _validate_app_id(self, app_id: str) -> bool:
         """Helper to validate app_id against main config."""
         try:
-            main_config = self.app_config_service.load_config()
-            if not main_config or not hasattr(main_config, 'navigationItems'):
-                logger.error(f"Main config or navigationItems not found when validating app_id {app_id}.")
-                return False
-
-            for item_wrapper in main_config.navigationItems:
-                item = item_wrapper.root # Access the actual AppLink or NavCategory from NavigationItem
-                if isinstance(item, AppLink):
-                    if item.id == app_id:
-                        return True
-                elif isinstance(item, NavCategory):
-                    for app in item.apps:
-                        if app.id == app_id:
-                            return True
-            return False # app_id not found
+            return self.app_config_service.get_snapshot().index.has_app(app_id)
         except AppConfigError:
             logger.error(f"Could not validate app_id {app_id} due to config service error.")
             return False # Consider this as invalid if config can't be loaded
@@ -68,44 +70,29 @@ class UserAppSettingsView(APIView):
             return False
 
     def get(self, request: HttpRequest, app_id: str, *args, **kwargs):
-        user_identifier = self._get_user_identifier(request)
+        user_identifier = request.principal.identifier # Resolved by config.middleware.PrincipalMiddleware
         if not user_identifier:
-            # Error handling similar to PUT/POST for consistency
-            return JsonResponse({'error': "User identification failed."}, status=status.HTTP_401_UNAUTHORIZED) # Or 500 if config error
+            return self._identification_error_response(request)
 
         if not self._validate_app_id(app_id):
             return Response({'error': f"Application with app_id '{app_id}' not found."}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            setting = UserApplicationSetting.objects.get(user_identifier=user_identifier, app_id=app_id)
+            setting = user_settings_store.for_user(user_identifier).get(app_id)
+            if setting is None:
+                return Response({'error': 'Settings not found for this user and application.'}, status=status.HTTP_404_NOT_FOUND)
             serializer = UserApplicationSettingSerializer(setting)
             return Response(serializer.data, status=status.HTTP_200_OK)
-        except UserApplicationSetting.DoesNotExist:
-            return Response({'error': 'Settings not found for this user and application.'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             logger.error(f"Error retrieving settings for user {user_identifier}, app {app_id}: {e}")
             return Response({'error': 'An unexpected server error occurred.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
     def post(self, request: HttpRequest, app_id: str, *args, **kwargs):
-        user_identifier = self._get_user_identifier(request)
+        user_identifier = request.principal.identifier
 
         if not user_identifier:
-            main_config_loaded = True
-            try:
-                main_config = self.app_config_service.load_config()
-            except AppConfigError:
-                main_config_loaded = False
-            
-            if not main_config_loaded:
-                 error_msg = "Forbidden: Cannot identify user due to main configuration error."
-                 return JsonResponse({'error': error_msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            elif hasattr(main_config, 'useRemoteAuth') and main_config.useRemoteAuth: # Check if main_config was loaded
-                error_msg = "Unauthorized: User identification failed (Remote auth header missing or invalid)."
-                return JsonResponse({'error': error_msg}, status=status.HTTP_401_UNAUTHORIZED)
-            else: 
-                error_msg = "Forbidden: Default user not configured or user identification failed for non-remote authentication mode."
-                return JsonResponse({'error': error_msg}, status=status.HTTP_403_FORBIDDEN)
+            return self._identification_error_response(request)
 
         if not self._validate_app_id(app_id):
             return Response({'error': f"Application with app_id '{app_id}' not found in system configuration."}, status=status.HTTP_400_BAD_REQUEST)
@@ -143,9 +130,9 @@ class UserAppSettingsView(APIView):
             return Response({'error': 'An unexpected server error occurred while saving settings.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def delete(self, request: HttpRequest, app_id: str, *args, **kwargs):
-        user_identifier = self._get_user_identifier(request)
+        user_identifier = request.principal.identifier
         if not user_identifier:
-            return JsonResponse({'error': "User identification failed."}, status=status.HTTP_401_UNAUTHORIZED)
+            return self._identification_error_response(request)
 
         if not self._validate_app_id(app_id):
             return Response({'error': f"Application with app_id '{app_id}' not found."}, status=status.HTTP_404_NOT_FOUND)
@@ -159,3 +146,207 @@ class UserAppSettingsView(APIView):
         except Exception as e:
             logger.error(f"Error deleting settings for user {user_identifier}, app {app_id}: {e}")
             return Response({'error': 'An unexpected server error occurred.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class UserAppSettingsBulkView(UserAppSettingsView):
+    """
+    API view to read and write the identified user's settings for many applications at once.
+    GET returns `{"settings": {app_id: settings}}` for `?app_ids=a,b,c` (default: every app with settings).
+    POST/PUT takes `{app_id: settings, ...}`, validates every app_id against the config in one
+    pass, and replaces those apps' settings with a single upsert statement. Nothing is written
+    if any entry is invalid.
+    """
+    http_method_names = ['get', 'post', 'put', 'head', 'options']
+
+    def get(self, request: HttpRequest, *args, **kwargs):
+        user_identifier = request.principal.identifier
+        if not user_identifier:
+            return self._identification_error_response(request)
+
+        try:
+            user_settings = user_settings_store.for_user(user_identifier)
+        except Exception as e:
+            logger.error(f"Error retrieving settings for user {user_identifier}: {e}")
+            return Response({'error': 'An unexpected server error occurred.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        app_ids = parse_app_ids(request) or user_settings.app_ids()
+        return Response({
+            'settings': {app_id: user_settings.settings_for(app_id) for app_id in app_ids if app_id in user_settings.app_ids()},
+        }, status=status.HTTP_200_OK)
+
+    def post(self, request: HttpRequest, *args, **kwargs):
+        user_identifier = request.principal.identifier
+        if not user_identifier:
+            return self._identification_error_response(request)
+
+        settings_by_app = request.data
+        if not isinstance(settings_by_app, dict) or not settings_by_app:
+            return Response({'error': "Expected a non-empty object mapping app_id to settings."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(settings_by_app) > BULK_MAX_APPS:
+            return Response({'error': f"Too many apps in one request (maximum {BULK_MAX_APPS})."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            config_index = self.app_config_service.get_snapshot().index
+        except AppConfigError as e:
+            logger.error(f"Could not validate app_ids for bulk settings update: {e}")
+            return Response({'error': "Cannot validate app_ids due to a configuration error."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        errors = {}
+        for app_id, app_settings in settings_by_app.items():
+            if not config_index.has_app(app_id):
+                errors[app_id] = "Application not found in system configuration."
+            elif not isinstance(app_settings, dict):
+                errors[app_id] = "Settings must be an object."
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            upsert_user_settings(user_identifier, settings_by_app)
+        except Exception as e:
+            logger.error(f"Unexpected error saving bulk settings for user {user_identifier}: {e}")
+            return Response({'error': 'An unexpected server error occurred while saving settings.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({'settings': settings_by_app}, status=status.HTTP_200_OK)
+
+    put = post
+
+
+class AsyncUserAppSettingsView(View):
+    """
+    Native async version of UserAppSettingsView (GET/POST/PUT/DELETE of one app's settings),
+    routed instead of it when the API is served over ASGI (settings.API_ASYNC_VIEWS).
+    Database access goes through the async ORM.
+    """
+    app_config_service = get_config_service()
+
+    def _identification_error_response(self, request: HttpRequest) -> JsonResponse:
+        return _identification_error(request.principal)
+
+    async def _validate_app_id(self, app_id: str) -> bool:
+        try:
+            return (await self.app_config_service.aget_snapshot()).index.has_app(app_id)
+        except AppConfigError:
+            logger.error(f"Could not validate app_id {app_id} due to config service error.")
+            return False
+
+    async def get(self, request: HttpRequest, app_id: str, *args, **kwargs):
+        user_identifier = request.principal.identifier
+        if not user_identifier:
+            return self._identification_error_response(request)
+
+        if not await self._validate_app_id(app_id):
+            return JsonResponse({'error': f"Application with app_id '{app_id}' not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            setting = (await user_settings_store.afor_user(user_identifier)).get(app_id)
+        except Exception as e:
+            logger.error(f"Error retrieving settings for user {user_identifier}, app {app_id}: {e}")
+            return JsonResponse({'error': 'An unexpected server error occurred.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if setting is None:
+            return JsonResponse({'error': 'Settings not found for this user and application.'}, status=status.HTTP_404_NOT_FOUND)
+        return JsonResponse(UserApplicationSettingSerializer(setting).data, status=status.HTTP_200_OK)
+
+    async def post(self, request: HttpRequest, app_id: str, *args, **kwargs):
+        user_identifier = request.principal.identifier
+        if not user_identifier:
+            return self._identification_error_response(request)
+
+        if not await self._validate_app_id(app_id):
+            return JsonResponse({'error': f"Application with app_id '{app_id}' not found in system configuration."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The request body IS the content of the 'settings' field, validated as by UserAppSettingsView
+        try:
+            request_data_settings = _parse_json_body(request)
+        except ParseError as e:
+            return JsonResponse({'detail': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = UserApplicationSettingUpdateSerializer(data={'settings': request_data_settings}, partial=True)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Only decides between 201 and 200; the write itself is a single upsert statement
+            created = not await UserApplicationSetting.objects.filter(user_identifier=user_identifier, app_id=app_id).aexists()
+            await sync_to_async(upsert_user_settings)(user_identifier, {app_id: serializer.validated_data['settings']})
+            setting = await UserApplicationSetting.objects.aget(user_identifier=user_identifier, app_id=app_id)
+        except Exception as e:
+            logger.error(f"Unexpected error saving settings for user {user_identifier}, app {app_id}: {e}")
+            return JsonResponse({'error': 'An unexpected server error occurred while saving settings.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return JsonResponse(UserApplicationSettingSerializer(setting).data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    put = post
+
+    async def delete(self, request: HttpRequest, app_id: str, *args, **kwargs):
+        user_identifier = request.principal.identifier
+        if not user_identifier:
+            return self._identification_error_response(request)
+
+        if not await self._validate_app_id(app_id):
+            return JsonResponse({'error': f"Application with app_id '{app_id}' not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            setting = await UserApplicationSetting.objects.aget(user_identifier=user_identifier, app_id=app_id)
+            await setting.adelete()
+            return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+        except UserApplicationSetting.DoesNotExist:
+            return JsonResponse({'error': 'Settings not found for this user and application.'}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            logger.error(f"Error deleting settings for user {user_identifier}, app {app_id}: {e}")
+            return JsonResponse({'error': 'An unexpected server error occurred.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncUserAppSettingsBulkView(AsyncUserAppSettingsView):
+    """Native async version of UserAppSettingsBulkView (see AsyncUserAppSettingsView)."""
+    http_method_names = ['get', 'post', 'put', 'head', 'options']
+
+    async def get(self, request: HttpRequest, *args, **kwargs):
+        user_identifier = request.principal.identifier
+        if not user_identifier:
+            return self._identification_error_response(request)
+
+        try:
+            user_settings = await user_settings_store.afor_user(user_identifier)
+        except Exception as e:
+            logger.error(f"Error retrieving settings for user {user_identifier}: {e}")
+            return JsonResponse({'error': 'An unexpected server error occurred.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        app_ids = parse_app_ids(request) or user_settings.app_ids()
+        return JsonResponse({
+            'settings': {app_id: user_settings.settings_for(app_id) for app_id in app_ids if app_id in user_settings.app_ids()},
+        }, status=status.HTTP_200_OK)
+
+    async def post(self, request: HttpRequest, *args, **kwargs):
+        user_identifier = request.principal.identifier
+        if not user_identifier:
+            return self._identification_error_response(request)
+
+        try:
+            settings_by_app = _parse_json_body(request)
+        except ParseError as e:
+            return JsonResponse({'detail': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(settings_by_app, dict) or not settings_by_app:
+            return JsonResponse({'error': "Expected a non-empty object mapping app_id to settings."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(settings_by_app) > BULK_MAX_APPS:
+            return JsonResponse({'error': f"Too many apps in one request (maximum {BULK_MAX_APPS})."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            config_index = (await self.app_config_service.aget_snapshot()).index
+        except AppConfigError as e:
+            logger.error(f"Could not validate app_ids for bulk settings update: {e}")
+            return JsonResponse({'error': "Cannot validate app_ids due to a configuration error."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        errors = {}
+        for app_id, app_settings in settings_by_app.items():
+            if not config_index.has_app(app_id):
+                errors[app_id] = "Application not found in system configuration."
+            elif not isinstance(app_settings, dict):
+                errors[app_id] = "Settings must be an object."
+        if errors:
+            return JsonResponse({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            await sync_to_async(upsert_user_settings)(user_identifier, settings_by_app)
+        except Exception as e:
+            logger.error(f"Unexpected error saving bulk settings for user {user_identifier}: {e}")
+            return JsonResponse({'error': 'An unexpected server error occurred while saving settings.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return JsonResponse({'settings': settings_by_app}, status=status.HTTP_200_OK)
+
+    put = post